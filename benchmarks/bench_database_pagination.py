@@ -0,0 +1,81 @@
+"""
+Benchmark DatabaseSource keyset pagination against LIMIT/OFFSET pagination
+on a local SQLite table standing in for the source database.
+
+Usage:
+    python benchmarks/bench_database_pagination.py [--rows 1000000] [--batch-size 10000]
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from vector_etl.source_mods.database_loader import DatabaseSource
+
+
+class SQLiteCursor:
+    """Translate the %s placeholders DatabaseSource emits to SQLite's ? style."""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def execute(self, query, params=None):
+        return self.cursor.execute(query.replace('%s', '?'), params or ())
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+    @property
+    def description(self):
+        return self.cursor.description
+
+    def close(self):
+        self.cursor.close()
+
+
+def make_table(path, rows):
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE tickets (id INTEGER PRIMARY KEY, subject TEXT, body TEXT)")
+    connection.executemany("INSERT INTO tickets VALUES (?, ?, ?)",
+                           ((i, f"ticket {i}", f"body of ticket {i} " * 4) for i in range(rows)))
+    connection.commit()
+    connection.close()
+
+
+def time_batches(path, config):
+    source = DatabaseSource(config)
+    source.connection = sqlite3.connect(path)
+    source.cursor = SQLiteCursor(source.connection.cursor())
+
+    timings = []
+    rows = 0
+    start = time.perf_counter()
+    for df_batch in source.fetch_data():
+        now = time.perf_counter()
+        timings.append(now - start)
+        rows += len(df_batch)
+        start = now
+    return timings, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--batch-size', type=int, default=10_000)
+    args = parser.parse_args()
+
+    base_config = {'db_type': 'postgres', 'query': 'SELECT * FROM tickets', 'batch_size': args.batch_size}
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'tickets.sqlite')
+        make_table(path, args.rows)
+
+        print(f"{'mode':>8} {'total (s)':>10} {'first batch (s)':>16} {'last batch (s)':>15} {'rows':>10}")
+        for mode, extra in [('offset', {'fetch_mode': 'offset'}), ('keyset', {'keyset_column': 'id'})]:
+            timings, rows = time_batches(path, {**base_config, **extra})
+            assert rows == args.rows
+            print(f"{mode:>8} {sum(timings):>10.2f} {timings[0]:>16.4f} {timings[-1]:>15.4f} {rows:>10}")
+
+
+if __name__ == '__main__':
+    main()
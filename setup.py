@@ -40,6 +40,7 @@ setup(
         "mysql-connector-python",
         "pymysql",
         "pandas",
+        "pyarrow",
         "qdrant-client",
         "singlestoredb",
         "weaviate-client",
@@ -69,6 +70,7 @@ setup(
         "pytest",
         "nltk",
         "pymilvus",
+        "pypdf",
     ],
     entry_points={
         "console_scripts": [
@@ -0,0 +1,55 @@
+import pytest
+import pandas as pd
+from vector_etl.chunking import chunk_offsets, split_dataframe_column
+
+
+def legacy_split(df, chunk_size, chunk_overlap, column):
+    rows = []
+    for _, row in df.iterrows():
+        text = row[column]
+        if not isinstance(text, str):
+            continue
+        for i in range(0, len(text), chunk_size - chunk_overlap):
+            new_row = row.copy()
+            new_row[column] = text[i:i + chunk_size]
+            rows.append(new_row)
+    return pd.DataFrame(rows, columns=df.columns)
+
+
+@pytest.fixture
+def sample_df():
+    return pd.DataFrame({
+        'text': ['abcdefghij', None, '', 'xyz', 'a' * 25],
+        'page_number': [1, 2, 3, 4, 5]
+    }, index=[10, 11, 12, 13, 14])
+
+
+def test_chunk_offsets():
+    parents, starts = chunk_offsets([10, 0, 3], chunk_size=4, chunk_overlap=1)
+
+    assert parents.tolist() == [0, 0, 0, 0, 2]
+    assert starts.tolist() == [0, 3, 6, 9, 0]
+
+
+def test_chunk_offsets_rejects_overlap_larger_than_size():
+    with pytest.raises(ValueError):
+        chunk_offsets([10], chunk_size=5, chunk_overlap=5)
+
+
+@pytest.mark.parametrize('chunk_size, chunk_overlap', [(4, 0), (4, 2), (100, 10)])
+def test_split_dataframe_column_matches_row_wise_split(sample_df, chunk_size, chunk_overlap):
+    expected = legacy_split(sample_df, chunk_size, chunk_overlap, 'text')
+    result = split_dataframe_column(sample_df, chunk_size, chunk_overlap, column='text')
+
+    assert result['text'].tolist() == expected['text'].tolist()
+    assert result['page_number'].tolist() == expected['page_number'].tolist()
+    assert result.index.tolist() == expected.index.tolist()
+    assert result['page_number'].dtype == sample_df['page_number'].dtype
+
+
+def test_split_dataframe_column_empty_frame():
+    df = pd.DataFrame({'text': [], 'other': []})
+    result = split_dataframe_column(df, 10, 0, column='text')
+
+    assert result.empty
+    assert list(result.columns) == ['text', 'other']
@@ -1,9 +1,15 @@
+import asyncio
+import sqlite3
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
 import pandas as pd
 import numpy as np
 from vector_etl.embedding_mods.openai import OpenAIEmbedding
 from vector_etl.embedding_mods.cohere import CohereEmbedding
+from vector_etl.embedding_mods.base import BaseEmbedding
+from vector_etl.embedding_mods.cache import EmbeddingCache
+from vector_etl.embedding_mods.batching import BatchPlanner, CharacterTokenizer
+from vector_etl.embedding_mods.resilience import AdaptiveConcurrency, RetryPolicy, retry_after
 
 @pytest.fixture
 def sample_df():
@@ -43,7 +49,8 @@ def test_openai_embedding(sample_df, openai_config):
         assert all(len(emb) == 1536 for emb in result_df['embeddings'])
 
 def test_cohere_embedding(sample_df, cohere_config):
-    with patch('cohere.Client') as mock_client:
+    with patch('cohere.Client'), patch('cohere.AsyncClient') as mock_client:
+        mock_client.return_value.embed = AsyncMock()
         mock_client.return_value.embed.return_value.embeddings = [
             np.random.rand(4096) for _ in range(len(sample_df))
         ]
@@ -56,3 +63,190 @@ def test_cohere_embedding(sample_df, cohere_config):
         assert all(isinstance(emb, np.ndarray) for emb in result_df['embeddings'])
         assert all(len(emb) == 4096 for emb in result_df['embeddings'])
 
+
+
+class SlowEmbedding(BaseEmbedding):
+    def __init__(self, config):
+        self.config = config
+        self.in_flight = 0
+        self.peak = 0
+
+    async def aembed_batch(self, texts, client=None):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        # Earlier batches take longer, so they complete out of order
+        await asyncio.sleep(0.001 * (100 - texts[0]))
+        self.in_flight -= 1
+        return [[float(t)] for t in texts]
+
+    def embed_batch(self, texts):
+        return [[float(t)] for t in texts]
+
+    def embed(self, df, embed_column='__concat_final'):
+        pass
+
+def test_embed_texts_runs_batches_concurrently_in_order():
+    embedding = SlowEmbedding({'batch_size': 3, 'max_concurrency': 5})
+    result = embedding.embed_texts(list(range(100)))
+
+    assert result == [[float(i)] for i in range(100)]
+    assert embedding.peak == 5
+
+def test_embed_texts_inside_running_loop():
+    embedding = SlowEmbedding({'batch_size': 10})
+
+    async def main():
+        return embedding.embed_texts(list(range(20)))
+
+    assert len(asyncio.run(main())) == 20
+
+def test_embed_texts_only_sends_cache_misses(tmp_path):
+    config = {'model_name': 'test-model', 'cache': {'path': str(tmp_path / 'cache.sqlite')}}
+    embedding = SlowEmbedding(config)
+    embedding.aembed_batch = AsyncMock(side_effect=lambda texts, client=None: [[float(len(t))] for t in texts])
+
+    first = embedding.embed_texts(['a', 'bb', 'a'])
+    second = SlowEmbedding(config)
+    second.aembed_batch = AsyncMock(side_effect=lambda texts, client=None: [[float(len(t))] for t in texts])
+    result = second.embed_texts(['bb', 'ccc', ' a '])
+
+    assert first == [[1.0], [2.0], [1.0]]
+    assert result == [[2.0], [3.0], [1.0]]
+    sent = [call.args[0] for call in second.aembed_batch.call_args_list]
+    assert sent == [['ccc']]
+    assert second.cache.hits == 2 and second.cache.misses == 1
+
+def test_embedding_cache_evicts_least_recently_used(tmp_path):
+    cache = EmbeddingCache(path=str(tmp_path / 'cache.sqlite'), max_size_mb=1400 / (1024 * 1024))
+    vector = [0.5] * 100
+    cache.put_many([('a', vector), ('b', vector), ('c', vector)])
+    cache.get_many(['a'])
+    cache.put_many([('d', vector)])
+
+    assert set(cache.get_many(['a', 'b', 'c', 'd'])) == {'a', 'c', 'd'}
+    assert cache.stats()['entries'] == 3
+
+def test_embedding_cache_tracks_its_size_across_writes(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    cache = EmbeddingCache(path=path, max_size_mb=5000 / (1024 * 1024))
+    cache.put_many([('a', [0.5] * 100), ('b', [0.5] * 100), ('a', [0.5] * 50)])
+    cache.put_many([('b', [0.5] * 10)] + [(f'key {i}', [0.5] * 200) for i in range(10)])
+
+    assert cache.size_bytes == cache.stats()['size_bytes'] <= 5000
+    cache.close()
+    assert EmbeddingCache(path=path).size_bytes == cache.size_bytes
+
+def test_embedding_cache_keeps_the_shape_of_nested_vectors(tmp_path):
+    path = tmp_path / 'cache.sqlite'
+    connection = sqlite3.connect(str(path))
+    connection.execute("CREATE TABLE embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL, "
+                       "size INTEGER NOT NULL, last_used REAL NOT NULL)")
+    connection.execute("INSERT INTO embeddings VALUES ('old', ?, 16, 0)", (np.zeros(2).tobytes(),))
+    connection.commit()
+    connection.close()
+
+    # Caches written before vectors had a shape are discarded
+    cache = EmbeddingCache(path=str(path))
+    assert cache.get_many(['old']) == {}
+
+    tokens = [[0.25, 0.5, 0.75], [1.0, 1.25, 1.5]]
+    cache.put_many([('tokens', tokens), ('vector', [0.5, 1.5])])
+    assert cache.get_many(['tokens', 'vector']) == {'tokens': tokens, 'vector': [0.5, 1.5]}
+    assert cache.stats()['size_bytes'] == 8 * 4
+
+def test_batch_planner_packs_to_item_and_token_limits():
+    planner = BatchPlanner(max_items=3, max_request_tokens=10, tokenizer=CharacterTokenizer(chars_per_token=1))
+    pieces, origins, counts = planner.prepare(['aaaa', 'bbbb', 'ccc', 'd', 'e'])
+    assert planner.plan(counts) == [(0, 2), (2, 5)]
+
+    pieces, origins, counts = planner.prepare(['a'] * 7)
+    assert planner.plan(counts) == [(0, 3), (3, 6), (6, 7)]
+
+def test_batch_planner_truncates_long_inputs():
+    planner = BatchPlanner(max_items=10, max_input_tokens=4, tokenizer=CharacterTokenizer(chars_per_token=1))
+    pieces, origins, counts = planner.prepare(['abcdefghij', 'xy'])
+
+    assert pieces == ['abcd', 'xy']
+    assert origins == [0, 1]
+
+def test_batch_planner_splits_and_recombines_long_inputs():
+    planner = BatchPlanner(max_items=10, max_input_tokens=4, overflow='split',
+                           tokenizer=CharacterTokenizer(chars_per_token=1))
+    pieces, origins, counts = planner.prepare(['abcdefghij', 'xy'])
+
+    assert pieces == ['abcd', 'efgh', 'ij', 'xy']
+    assert origins == [0, 0, 0, 1]
+
+    combined = planner.combine([[1.0, 0.0], [1.0, 0.0], [0.0, 1.0], [0.5, 0.5]], origins, counts, 2)
+    assert np.allclose(combined[0], np.array([8.0, 2.0]) / np.linalg.norm([8.0, 2.0]))
+    assert combined[1] == [0.5, 0.5]
+
+def test_batch_planner_error_policy():
+    planner = BatchPlanner(max_items=10, max_input_tokens=4, overflow='error',
+                           tokenizer=CharacterTokenizer(chars_per_token=1))
+    with pytest.raises(ValueError):
+        planner.prepare(['abcdefghij'])
+
+class ApiError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.headers = headers or {}
+
+class FlakyEmbedding(SlowEmbedding):
+    def __init__(self, config, errors):
+        super().__init__(config)
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def aembed_batch(self, texts, client=None):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return [[float(t)] for t in texts]
+
+def test_embed_texts_retries_throttled_requests():
+    embedding = FlakyEmbedding({'batch_size': 10, 'retry_base_delay': 0.001},
+                               [ApiError(429, {'Retry-After': '0.01'}), ApiError(503)])
+    result = embedding.embed_texts([1, 2, 3])
+
+    assert result == [[1.0], [2.0], [3.0]]
+    assert embedding.calls == 3
+
+def test_embed_texts_does_not_retry_client_errors():
+    embedding = FlakyEmbedding({'batch_size': 10}, [ApiError(400)])
+
+    with pytest.raises(ApiError):
+        embedding.embed_texts([1, 2, 3])
+    assert embedding.calls == 1
+
+def test_embed_texts_gives_up_after_max_retries():
+    embedding = FlakyEmbedding({'batch_size': 10, 'max_retries': 2, 'retry_base_delay': 0.001},
+                               [ApiError(500)] * 5)
+
+    with pytest.raises(ApiError):
+        embedding.embed_texts([1])
+    assert embedding.calls == 3
+
+def test_retry_after_headers():
+    assert retry_after(ApiError(429, {'Retry-After': '7'})) == 7
+    assert retry_after(ApiError(429, {'retry-after-ms': '250'})) == 0.25
+    assert retry_after(ApiError(429, {'x-ratelimit-reset-requests': '1s', 'x-ratelimit-reset-tokens': '6m0s'})) == 360
+    assert retry_after(ApiError(429)) is None
+    assert RetryPolicy(max_delay=30).delay(ApiError(429, {'Retry-After': '120'}), 0) == 30
+
+def test_adaptive_concurrency_backs_off_once_per_round_and_recovers():
+    async def scenario():
+        limiter = AdaptiveConcurrency(8, max_limit=8)
+        generations = [await limiter.acquire() for _ in range(8)]
+        for generation in generations[:4]:
+            await limiter.release(generation, throttled=True)
+        assert limiter.limit == 4
+
+        for generation in generations[4:]:
+            await limiter.release(generation)
+        for _ in range(50):
+            await limiter.release(await limiter.acquire())
+        return limiter.limit
+
+    assert asyncio.run(scenario()) == 8
@@ -0,0 +1,308 @@
+import threading
+import uuid
+import pytest
+from unittest.mock import Mock
+import numpy as np
+import pandas as pd
+from vector_etl.orchestrator import ETLOrchestrator
+from vector_etl.ids import generate_uuids
+from vector_etl.source_mods import google_drive
+from vector_etl.source_mods.database_loader import DatabaseSource
+from vector_etl.source_mods.google_drive import GoogleDriveSource
+from vector_etl.source_mods.local_file import LocalFileSource
+from vector_etl.state import ChangeLedger, JSONWatermarkStore
+
+
+@pytest.fixture
+def orchestrator():
+    orchestrator = ETLOrchestrator.__new__(ETLOrchestrator)
+    orchestrator.source_config = {'source_data_type': 'database'}
+    orchestrator.target_config = {'target_database': 'Mock', 'index_name': 'test'}
+    orchestrator.embed_columns = []
+    orchestrator.id_strategy = 'random'
+    orchestrator.ledger = None
+    return orchestrator
+
+
+@pytest.fixture
+def sample_df():
+    return pd.DataFrame({
+        'customer_name': ['alice', None, 'carol'],
+        'order_total': [10.5, np.nan, 3.0],
+        'notes': ['late', None, None]
+    })
+
+
+def test_generate_concatenation_embed_columns(orchestrator, sample_df):
+    orchestrator.embed_columns = ['customer_name', 'notes']
+    df = orchestrator.generate_concatenation(sample_df)
+
+    assert df['__concat_final'].tolist() == [
+        'CustomerName: alice ~ Notes: late',
+        '',
+        'CustomerName: carol'
+    ]
+
+
+def test_generate_concatenation_all_columns(orchestrator, sample_df):
+    df = orchestrator.generate_concatenation(sample_df)
+
+    assert df['__concat_final'].tolist() == [
+        'CustomerName: alice ~ OrderTotal: 10.5 ~ Notes: late',
+        '',
+        'CustomerName: carol ~ OrderTotal: 3.0'
+    ]
+    assert df['df_uuid'].nunique() == len(df)
+
+
+def test_generate_uuids():
+    ids = generate_uuids(1000)
+
+    assert len(set(ids)) == 1000
+    assert all(uuid.UUID(value).version == 4 for value in ids)
+    assert generate_uuids(0) == []
+
+
+@pytest.mark.parametrize('pipeline_config', [{}, {'mode': 'pipelined', 'embed_workers': 2}])
+def test_run_writes_every_batch(orchestrator, sample_df, pipeline_config):
+    orchestrator.source = Mock()
+    orchestrator.source.fetch_data.return_value = iter([sample_df.copy(), sample_df.iloc[:0], sample_df.copy()])
+    orchestrator.embedding = Mock()
+    orchestrator.embedding.embed.side_effect = lambda df: df.assign(embeddings=[[0.0]] * len(df))
+    orchestrator.target = Mock()
+    orchestrator.pipeline_config = pipeline_config
+
+    orchestrator.run()
+
+    assert orchestrator.embedding.embed.call_count == 2
+    assert orchestrator.target.write_data.call_count == 2
+
+
+def mock_components(orchestrator, batches):
+    orchestrator.source = Mock()
+    orchestrator.source.fetch_data.side_effect = lambda: iter([batch.copy() for batch in batches])
+    orchestrator.embedding = Mock()
+    orchestrator.embedding.embed.side_effect = lambda df: df.assign(embeddings=[[0.0]] * len(df))
+    orchestrator.target = Mock()
+    orchestrator.pipeline_config = {}
+
+
+def written_ids(orchestrator):
+    return [call.args[0]['df_uuid'].tolist() for call in orchestrator.target.write_data.call_args_list]
+
+
+def test_columns_id_strategy_is_stable_and_unique_per_chunk(orchestrator):
+    df = pd.DataFrame({'ticket_id': [1, 2], 'body': ['x' * 25, 'short']})
+    orchestrator.source_config.update({'id_strategy': 'columns', 'id_columns': ['ticket_id'], 'chunk_size': 20})
+    orchestrator.id_strategy = 'columns'
+    orchestrator.embed_columns = ['body']
+    mock_components(orchestrator, [df])
+
+    orchestrator.run()
+    orchestrator.run()
+
+    first, second = written_ids(orchestrator)
+    assert first == second
+    assert len(set(first)) == len(first) == 3
+
+
+def test_columns_id_strategy_ignores_query_edits(orchestrator):
+    df = pd.DataFrame({'ticket_id': [1, 2], 'body': ['first', 'second']})
+    orchestrator.id_strategy = 'columns'
+    orchestrator.source_config.update({'id_columns': ['ticket_id'], 'table': 'tickets',
+                                       'query': 'SELECT * FROM tickets'})
+    keys = orchestrator.record_keys(df).tolist()
+
+    orchestrator.source_config['query'] = 'SELECT ticket_id, body FROM tickets ORDER BY ticket_id'
+    assert orchestrator.record_keys(df).tolist() == keys
+
+    orchestrator.source_config['flow_name'] = 'tickets'
+    assert orchestrator.record_keys(df).tolist() == ['tickets\x1f1', 'tickets\x1f2']
+
+
+@pytest.mark.parametrize('embed_columns', [[], ['title']])
+def test_metadata_columns_project_only_with_embed_columns(monkeypatch, embed_columns):
+    for factory in ('get_source_class', 'get_embedding_model', 'get_target_database'):
+        monkeypatch.setattr(f'vector_etl.orchestrator.{factory}', Mock())
+    orchestrator = ETLOrchestrator({'source_data_type': 'Local', 'metadata_columns': ['year']}, {}, {},
+                                   embed_columns)
+
+    if embed_columns:
+        orchestrator.source.project.assert_called_once_with(['title', 'year'])
+    else:
+        orchestrator.source.project.assert_not_called()
+
+
+@pytest.mark.parametrize('option', [{'watermark_column': 'updated_at'}, {'skip_unchanged_files': True}])
+def test_ordinal_id_strategy_rejects_incremental_sources(monkeypatch, option):
+    for factory in ('get_source_class', 'get_embedding_model', 'get_target_database'):
+        monkeypatch.setattr(f'vector_etl.orchestrator.{factory}', Mock())
+    source_config = {'source_data_type': 'Local', 'id_strategy': 'ordinal', **option}
+
+    with pytest.raises(ValueError, match="ordinal"):
+        ETLOrchestrator(source_config, {}, {}, [])
+
+
+def test_skip_unchanged_only_embeds_changed_chunks(orchestrator, tmp_path):
+    orchestrator.id_strategy = 'ordinal'
+    orchestrator.ledger = ChangeLedger(path=str(tmp_path / 'ledger.sqlite'))
+    mock_components(orchestrator, [pd.DataFrame({'body': ['a', 'b', 'c']})])
+    orchestrator.run()
+
+    mock_components(orchestrator, [pd.DataFrame({'body': ['a', 'B', 'c']})])
+    orchestrator.run()
+
+    embedded = orchestrator.embedding.embed.call_args.args[0]
+    assert embedded['body'].tolist() == ['B']
+    assert '__content_hash' not in orchestrator.target.write_data.call_args.args[0].columns
+
+    mock_components(orchestrator, [pd.DataFrame({'body': ['a', 'B', 'c']})])
+    orchestrator.run()
+
+    orchestrator.embedding.embed.assert_not_called()
+    orchestrator.target.write_data.assert_not_called()
+
+
+def incremental_source(orchestrator, tmp_path, pages, fail_on_write=None):
+    config = {'source_data_type': 'database', 'db_type': 'postgres', 'query': 'SELECT * FROM tickets',
+              'batch_size': 2, 'watermark_column': 'seq', 'keyset_column': 'seq',
+              'watermark_store': {'type': 'json', 'path': str(tmp_path / 'watermarks.json')}}
+    cursor = Mock()
+    cursor.fetchall.side_effect = pages
+    cursor.description = [('seq',), ('body',)]
+
+    orchestrator.source_config = config
+    orchestrator.source = DatabaseSource(config)
+    orchestrator.source.connection = Mock()
+    orchestrator.source.cursor = cursor
+    orchestrator.embedding = Mock()
+    orchestrator.embedding.embed.side_effect = lambda df: df.assign(embeddings=[[0.0]] * len(df))
+    orchestrator.target = Mock()
+    orchestrator.target.write_data.side_effect = fail_on_write
+    orchestrator.pipeline_config = {}
+    orchestrator._watermark_lock = threading.Lock()
+    return cursor
+
+
+def test_watermark_advances_after_writes(orchestrator, tmp_path):
+    incremental_source(orchestrator, tmp_path, [[(1, 'a'), (2, 'b')], [(3, 'c')]])
+    orchestrator.run()
+
+    store = JSONWatermarkStore(str(tmp_path / 'watermarks.json'))
+    assert store.get(orchestrator.source.watermark_key()) == 3
+
+    cursor = incremental_source(orchestrator, tmp_path, [[]])
+    orchestrator.run()
+
+    query, params = cursor.execute.call_args.args
+    assert 'WHERE seq > %s' in query
+    assert params == (3,)
+
+
+def test_watermark_stops_at_last_written_batch(orchestrator, tmp_path):
+    writes = iter([None, RuntimeError('target unavailable')])
+
+    def write(*args):
+        error = next(writes)
+        if error:
+            raise error
+
+    incremental_source(orchestrator, tmp_path, [[(1, 'a'), (2, 'b')], [(3, 'c'), (4, 'd')], [(5, 'e')]],
+                       fail_on_write=write)
+    with pytest.raises(RuntimeError):
+        orchestrator.run()
+
+    # Rows sharing the batch's highest value could still follow, so the checkpoint stays below it
+    store = JSONWatermarkStore(str(tmp_path / 'watermarks.json'))
+    assert store.get(orchestrator.source.watermark_key()) == 1
+
+
+def manifest_source(orchestrator, tmp_path, fail_on_write=None):
+    config = {'source_data_type': 'Local', 'file_path': str(tmp_path / 'data' / 'part_'), 'file_batch_size': 1,
+              'download_concurrency': 1, 'skip_unchanged_files': {'path': str(tmp_path / 'manifest.sqlite')}}
+    orchestrator.source_config = config
+    orchestrator.source = LocalFileSource(config)
+    orchestrator.embedding = Mock()
+    orchestrator.embedding.embed.side_effect = lambda df: df.assign(embeddings=[[0.0]] * len(df))
+    orchestrator.target = Mock()
+    orchestrator.target.write_data.side_effect = fail_on_write
+    orchestrator.pipeline_config = {}
+    orchestrator._files_lock = threading.Lock()
+
+
+def test_file_manifest_skips_files_already_written(orchestrator, tmp_path):
+    (tmp_path / 'data').mkdir()
+    for i in range(3):
+        (tmp_path / 'data' / f'part_{i}.csv').write_text(f'text\nfile {i}\n')
+
+    def written_texts():
+        return sorted(call.args[0]['text'].iloc[0] for call in orchestrator.target.write_data.call_args_list)
+
+    writes = iter([None, RuntimeError('target unavailable')])
+
+    def write(*args):
+        error = next(writes)
+        if error:
+            raise error
+
+    manifest_source(orchestrator, tmp_path, fail_on_write=write)
+    with pytest.raises(RuntimeError):
+        orchestrator.run()
+    first_written = orchestrator.target.write_data.call_args_list[0].args[0]['text'].iloc[0]
+
+    # Only the file whose write succeeded is skipped
+    manifest_source(orchestrator, tmp_path)
+    orchestrator.run()
+    assert first_written not in written_texts()
+    assert len(written_texts()) == 2
+
+    manifest_source(orchestrator, tmp_path)
+    orchestrator.run()
+    orchestrator.target.write_data.assert_not_called()
+
+    (tmp_path / 'data' / 'part_1.csv').write_text('text\nfile 1 edited\n')
+    manifest_source(orchestrator, tmp_path)
+    orchestrator.run()
+    assert written_texts() == ['file 1 edited']
+
+
+class FakeMediaDownload:
+    def __init__(self, fh, request):
+        self.fh = fh
+        self.content = request
+
+    def next_chunk(self):
+        self.fh.write(self.content)
+        return None, True
+
+def test_google_drive_manifest_skips_files_already_written(orchestrator, tmp_path, monkeypatch):
+    monkeypatch.setattr(google_drive, 'MediaIoBaseDownload', FakeMediaDownload)
+    drive_files = {'a': b'text\nfile a\n', 'b': b'text\nfile b\n'}
+
+    def run(**options):
+        config = {'source_data_type': 'Google Drive', 'folder_id': 'folder', 'file_type': 'text/csv',
+                  'skip_unchanged_files': {'path': str(tmp_path / 'manifest.sqlite')}, **options}
+        service = Mock()
+        service.files.return_value.list.return_value.execute.return_value = {'files': [
+            {'id': file_id, 'name': f'{file_id}.csv', 'md5Checksum': str(hash(content))}
+            for file_id, content in drive_files.items()]}
+        service.files.return_value.get_media.side_effect = lambda fileId: drive_files[fileId]
+
+        orchestrator.source_config = config
+        orchestrator.source = GoogleDriveSource(config)
+        orchestrator.source.service = service
+        orchestrator.embedding = Mock()
+        orchestrator.embedding.embed.side_effect = lambda df: df.assign(embeddings=[[0.0]] * len(df))
+        orchestrator.target = Mock()
+        orchestrator.pipeline_config = {}
+        orchestrator._files_lock = threading.Lock()
+        orchestrator.run()
+        return [text for call in orchestrator.target.write_data.call_args_list for text in call.args[0]['text']]
+
+    assert run() == ['file a', 'file b']
+    assert run() == []
+
+    drive_files['b'] = b'text\nfile b edited\n'
+    drive_files['c'] = b'text\nfile c\n'
+    # Files listed in loaded_files are still skipped
+    assert run(loaded_files=['c']) == ['file b edited']
@@ -0,0 +1,104 @@
+import time
+import threading
+import pytest
+from vector_etl.pipeline import Pipeline
+
+
+def test_pipeline_preserves_order():
+    written = []
+
+    def process(batch):
+        # Later batches finish first
+        time.sleep(0.01 * (5 - batch))
+        return batch * 10
+
+    pipeline = Pipeline(process, written.append, process_workers=4, preserve_order=True)
+    pipeline.run(iter(range(5)))
+
+    assert written == [0, 10, 20, 30, 40]
+
+
+def test_pipeline_bounds_reordering_behind_a_slow_batch():
+    processed = []
+    processed_before_first_write = []
+    written = []
+
+    def process(batch):
+        # The first batch is slow, so later ones finish ahead of it
+        time.sleep(0.3 if batch == 0 else 0)
+        processed.append(batch)
+        return batch
+
+    def write(batch):
+        if not written:
+            processed_before_first_write.append(len(processed))
+        written.append(batch)
+
+    pipeline = Pipeline(process, write, queue_depth=2, process_workers=4, preserve_order=True)
+    pipeline.run(iter(range(20)))
+
+    assert written == list(range(20))
+    # Later batches wait for their turn instead of piling up behind the first:
+    # each worker holds at most one, and batch 0 itself is processed last
+    assert processed_before_first_write[0] <= 4 + 1
+
+
+def test_pipeline_unordered_writes_every_batch():
+    written = []
+    lock = threading.Lock()
+
+    def write(batch):
+        with lock:
+            written.append(batch)
+
+    pipeline = Pipeline(lambda batch: batch, write, process_workers=3, write_workers=2)
+    pipeline.run(iter(range(20)))
+
+    assert sorted(written) == list(range(20))
+
+
+def test_pipeline_overlaps_stages():
+    def fetch():
+        for i in range(4):
+            time.sleep(0.05)
+            yield i
+
+    def slow(batch):
+        time.sleep(0.05)
+        return batch
+
+    start = time.perf_counter()
+    Pipeline(slow, slow).run(fetch())
+    elapsed = time.perf_counter() - start
+
+    # Sequentially this takes 4 * 3 * 0.05 = 0.6s
+    assert elapsed < 0.45
+
+
+def test_pipeline_propagates_errors_and_closes_source():
+    closed = []
+
+    def fetch():
+        try:
+            for i in range(1000):
+                yield i
+        finally:
+            closed.append(True)
+
+    def write(batch):
+        if batch == 3:
+            raise RuntimeError("target unavailable")
+
+    with pytest.raises(RuntimeError, match="target unavailable"):
+        Pipeline(lambda batch: batch, write, queue_depth=1).run(fetch())
+
+    assert closed == [True]
+
+
+def test_pipeline_from_config():
+    pipeline = Pipeline.from_config(None, None, {'queue_depth': 4, 'embed_workers': 3,
+                                                 'write_workers': 2, 'preserve_order': True})
+
+    assert pipeline.queue_depth == 4
+    assert pipeline.process_workers == 3
+    assert pipeline.write_workers == 1
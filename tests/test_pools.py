@@ -0,0 +1,103 @@
+import os
+import threading
+import pytest
+from unittest.mock import Mock
+from vector_etl.pools import ConnectionPool, ProcessPool
+
+
+class OperationalError(Exception):
+    pass
+
+
+def make_pool(**kwargs):
+    connect = Mock(side_effect=lambda: Mock(closed=0))
+    return ConnectionPool(connect, **kwargs), connect
+
+
+def test_pool_reuses_released_connections():
+    pool, connect = make_pool()
+
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        pass
+
+    assert first is second
+    connect.assert_called_once()
+    first.rollback.assert_called()
+
+
+def test_pool_replaces_connections_that_fail_the_health_check():
+    pool, connect = make_pool(health_check_interval=0)
+    with pool.connection() as first:
+        pass
+    first.cursor.return_value.execute.side_effect = OperationalError('server closed the connection')
+
+    with pool.connection() as second:
+        pass
+
+    assert second is not first
+    first.close.assert_called_once()
+    assert connect.call_count == 2
+
+
+def test_pool_discards_connections_after_disconnect_errors():
+    pool, connect = make_pool()
+
+    with pytest.raises(OperationalError):
+        with pool.connection() as first:
+            raise OperationalError('connection reset')
+    with pool.connection() as second:
+        pass
+
+    first.close.assert_called_once()
+    assert second is not first
+
+
+def test_pool_blocks_at_max_size():
+    pool, connect = make_pool(max_size=1)
+    held = pool.acquire()
+    acquired = []
+
+    waiter = threading.Thread(target=lambda: acquired.append(pool.acquire()))
+    waiter.start()
+    waiter.join(0.2)
+    assert not acquired
+
+    pool.release(held)
+    waiter.join(1)
+    assert acquired == [held]
+    connect.assert_called_once()
+
+    pool.release(held)
+    pool.close()
+    held.close.assert_called_once()
+
+
+def test_pool_releases_connections_held_by_abandoned_generators():
+    pool, connect = make_pool(max_size=1)
+
+    def rows():
+        with pool.connection():
+            yield 1
+            yield 2
+
+    batches = rows()
+    next(batches)
+    batches.close()
+
+    # Would block if the only slot had leaked
+    with pool.connection():
+        pass
+    connect.assert_called_once()
+
+
+def test_process_pool_recycles_workers():
+    pool = ProcessPool(1, max_tasks_per_worker=2)
+    try:
+        pids = [pool.submit(os.getpid).result() for _ in range(4)]
+    finally:
+        pool.shutdown()
+
+    assert pids[0] == pids[1] != pids[2] == pids[3]
+    assert os.getpid() not in pids
@@ -2,9 +2,25 @@ import pytest
 from unittest.mock import Mock, patch
 import pandas as pd
 from io import BytesIO
+from types import SimpleNamespace
 from vector_etl.source_mods.s3_loader import S3Source
-from vector_etl.source_mods.database_loader import DatabaseSource
+import datetime
+import json
+import os
+import threading
+import time
+import requests
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+from pypdf import PdfReader, PdfWriter
+from urllib.parse import parse_qs, urlsplit
+from simple_salesforce import Salesforce
+from vector_etl.source_mods.database_loader import (DatabaseSource, add_soql_condition, partition_conditions,
+                                                    split_range)
 from vector_etl.source_mods.local_file import LocalFileSource
+from vector_etl.source_mods.buffer import ColumnBuffer
+from vector_etl.source_mods.readers import iter_json_array
 
 @pytest.fixture
 def s3_config():
@@ -89,6 +105,225 @@ def test_database_source_fetch_data(db_config):
         assert len(df) == 2
         assert list(df.columns) == ['id', 'name']
 
+def test_database_source_keyset_pagination(db_config):
+    db_config.update({'batch_size': 2, 'keyset_column': 'id'})
+    with patch('psycopg2.connect') as mock_connect:
+        mock_cursor = Mock()
+        mock_connect.return_value.cursor.return_value = mock_cursor
+        mock_cursor.fetchall.side_effect = [[(1, 'a'), (2, 'b')], [(5, 'c'), (7, 'd')], [(9, 'e')]]
+        mock_cursor.description = [('id',), ('name',)]
+
+        source = DatabaseSource(db_config)
+        batches = list(source.fetch_data())
+
+        assert [len(batch) for batch in batches] == [2, 2, 1]
+        queries = [call.args for call in mock_cursor.execute.call_args_list]
+        assert queries[0] == ("SELECT * FROM (SELECT * FROM test_table) AS vetl_keyset ORDER BY id LIMIT 2", None)
+        assert queries[1] == ("SELECT * FROM (SELECT * FROM test_table) AS vetl_keyset WHERE (id > %s) "
+                              "ORDER BY id LIMIT 2", (2,))
+        assert queries[2][1] == (7,)
+
+        # The connection goes back to the pool and is reused by the next run
+        mock_connect.return_value.close.assert_not_called()
+        mock_cursor.fetchall.side_effect = [[]]
+        list(source.fetch_data())
+        mock_connect.assert_called_once()
+        source.close()
+        mock_connect.return_value.close.assert_called_once()
+
+def test_database_source_stream(db_config):
+    db_config.update({'batch_size': 2, 'fetch_mode': 'stream'})
+    with patch('psycopg2.connect') as mock_connect:
+        stream_cursor = Mock()
+        mock_connect.return_value.cursor.side_effect = lambda name=None: stream_cursor if name else Mock()
+        stream_cursor.fetchmany.side_effect = [[(1, 'a'), (2, 'b')], [(3, 'c')], []]
+        stream_cursor.description = [('id',), ('name',)]
+
+        source = DatabaseSource(db_config)
+        batches = list(source.fetch_data())
+
+        assert [batch['id'].tolist() for batch in batches] == [[1, 2], [3]]
+        stream_cursor.execute.assert_called_once_with('SELECT * FROM test_table', None)
+        stream_cursor.fetchmany.assert_called_with(2)
+        stream_cursor.close.assert_called_once()
+
+def test_database_source_arrow_batches():
+    config = {'db_type': 'snowflake', 'account': 'acct', 'database_name': 'db', 'username': 'user',
+              'password': 'pass', 'warehouse_name': 'wh', 'schema': 'public', 'query': 'SELECT * FROM t',
+              'fetch_mode': 'arrow'}
+    with patch('snowflake.connector.connect') as mock_connect:
+        mock_cursor = Mock()
+        mock_connect.return_value.cursor.return_value = mock_cursor
+        mock_cursor.fetch_pandas_batches.return_value = iter([
+            pd.DataFrame({'ID': [1, 2]}), pd.DataFrame({'ID': []}), pd.DataFrame({'ID': [3]})])
+
+        batches = list(DatabaseSource(config).fetch_data())
+
+        assert [batch['ID'].tolist() for batch in batches] == [[1, 2], [3]]
+        mock_cursor.execute.assert_called_once_with('SELECT * FROM t', None)
+        mock_cursor.fetchall.assert_not_called()
+
+class ReplayAdapter(requests.adapters.BaseAdapter):
+    """Stands in for the Salesforce API by replaying recorded responses."""
+
+    def __init__(self, recordings):
+        super().__init__()
+        self.recordings = recordings
+        self.requests = []
+
+    def send(self, request, **kwargs):
+        url = urlsplit(request.url)
+        params = parse_qs(url.query)
+        self.requests.append((request.method, url.path, params, request.body))
+
+        status, headers, body = self.recordings[(request.method, url.path, params.get('locator', [None])[0])]
+        response = requests.Response()
+        response.status_code = status
+        response.headers.update(headers)
+        response._content = (body if isinstance(body, str) else json.dumps(body)).encode()
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+def salesforce_source(recordings, **config):
+    session = requests.Session()
+    adapter = ReplayAdapter(recordings)
+    session.mount('https://', adapter)
+
+    source = DatabaseSource({'db_type': 'salesforce', 'query': 'SELECT Id, Subject FROM Case', **config})
+    source.connection = Salesforce(instance_url='https://example.my.salesforce.com', session_id='token',
+                                   session=session)
+    return source, adapter
+
+SALESFORCE_API = '/services/data/v59.0'
+
+def test_salesforce_query_follows_query_more():
+    def record(case_id):
+        return {'attributes': {'type': 'Case', 'url': f'{SALESFORCE_API}/sobjects/Case/{case_id}'},
+                'Id': case_id, 'Subject': f'Subject {case_id}'}
+
+    recordings = {
+        ('GET', f'{SALESFORCE_API}/query/', None): (200, {}, {
+            'totalSize': 3, 'done': False, 'nextRecordsUrl': f'{SALESFORCE_API}/query/01g-2',
+            'records': [record('500A'), record('500B')]}),
+        ('GET', f'{SALESFORCE_API}/query/01g-2', None): (200, {}, {
+            'totalSize': 3, 'done': True, 'records': [record('500C')]}),
+    }
+    source, adapter = salesforce_source(recordings, batch_size=2)
+    batches = list(source.fetch_data())
+
+    assert [batch['Id'].tolist() for batch in batches] == [['500A', '500B'], ['500C']]
+    assert list(batches[0].columns) == ['Id', 'Subject']
+    assert adapter.requests[0][2]['q'] == ['SELECT Id, Subject FROM Case']
+
+def test_salesforce_bulk_streams_result_pages(tmp_path):
+    jobs = f'{SALESFORCE_API}/jobs/query'
+    recordings = {
+        ('POST', jobs, None): (200, {}, {'id': '750X', 'state': 'UploadComplete'}),
+        ('GET', f'{jobs}/750X', None): (200, {}, {'id': '750X', 'state': 'JobComplete'}),
+        ('GET', f'{jobs}/750X/results', None): (
+            200, {'Sforce-Locator': 'MTAw', 'Sforce-NumberOfRecords': '2'},
+            'Id,Subject,SystemModstamp\n500A,First,2024-05-01T10:00:00.000Z\n500B,Second,2024-05-02T10:00:00.000Z\n'),
+        ('GET', f'{jobs}/750X/results', 'MTAw'): (
+            200, {'Sforce-Locator': 'null', 'Sforce-NumberOfRecords': '1'},
+            'Id,Subject,SystemModstamp\n500C,Third,2024-05-03T10:00:00.000Z\n'),
+    }
+    source, adapter = salesforce_source(
+        recordings, fetch_mode='bulk', batch_size=2, bulk_poll_interval=0, watermark_column='SystemModstamp',
+        watermark_store={'type': 'json', 'path': str(tmp_path / 'watermarks.json')})
+    source.update_db_watermark('2024-04-30T08:15:00.000+0000')
+
+    batches = list(source.fetch_data())
+
+    assert [batch['Id'].tolist() for batch in batches] == [['500A', '500B'], ['500C']]
+    posted = [json.loads(request[3]) for request in adapter.requests if request[0] == 'POST']
+    assert [job['query'] for job in posted] == [
+        'SELECT Id, Subject FROM Case WHERE SystemModstamp > 2024-04-30T08:15:00Z']
+    assert adapter.requests[-1][2] == {'maxRecords': ['2'], 'locator': ['MTAw']}
+    assert source.batch_watermark(batches[1]) == (None, '2024-05-03T10:00:00.000Z')
+
+def test_add_soql_condition():
+    query = "SELECT Id, (SELECT Id FROM Contacts WHERE Email != null) FROM Account WHERE Type = 'A' OR Type = 'B' LIMIT 5"
+
+    assert add_soql_condition(query, 'SystemModstamp > 2024-01-01T00:00:00Z') == (
+        "SELECT Id, (SELECT Id FROM Contacts WHERE Email != null) FROM Account "
+        "WHERE (Type = 'A' OR Type = 'B') AND SystemModstamp > 2024-01-01T00:00:00Z LIMIT 5")
+    assert add_soql_condition('SELECT Id FROM Case;', 'IsClosed = false') == 'SELECT Id FROM Case WHERE IsClosed = false'
+
+def test_split_range():
+    assert split_range(0, 100, 4) == [0, 25, 50, 75, 100]
+    assert split_range(1, 3, 4) == [1, 2, 3]
+    assert split_range(datetime.date(2024, 1, 1), datetime.date(2024, 1, 31), 3) == [
+        datetime.date(2024, 1, 1), datetime.date(2024, 1, 11), datetime.date(2024, 1, 21), datetime.date(2024, 1, 31)]
+
+def test_partition_conditions_cover_every_row():
+    assert partition_conditions('id', [0, 50, 100]) == [
+        ('id < %s', (50,)), ('id >= %s', (50,)), ('id IS NULL', ())]
+    assert partition_conditions('id', [0, 100]) == [('id IS NOT NULL', ()), ('id IS NULL', ())]
+
+def test_database_source_partitioned(db_config):
+    db_config.update({'batch_size': 10, 'fetch_mode': 'partitioned', 'partition_column': 'id', 'partitions': 2})
+    executed = []
+
+    def make_connection(**kwargs):
+        cursor = Mock()
+        cursor.fetchone.return_value = (1, 100)
+        cursor.description = [('id',)]
+        pages = []
+
+        def execute(query, params=None):
+            executed.append((query, params))
+            # Each partition returns one row holding its first parameter
+            pages.extend([[(params[0] if params else None,)], []])
+
+        cursor.execute.side_effect = execute
+        cursor.fetchmany.side_effect = lambda size: pages.pop(0)
+        connection = Mock()
+        connection.cursor.return_value = cursor
+        return connection
+
+    with patch('psycopg2.connect', side_effect=make_connection) as mock_connect:
+        source = DatabaseSource(db_config)
+        batches = list(source.fetch_data())
+
+    assert mock_connect.call_count <= 4
+    assert executed[0] == ('SELECT MIN(id), MAX(id) FROM (SELECT * FROM test_table) AS vetl_bounds', None)
+    assert sorted(batch['id'].iloc[0] for batch in batches if batch['id'].iloc[0] is not None) == [50, 50]
+    assert sum(len(batch) for batch in batches) == 3
+    assert len(executed) == 4
+
+def test_database_source_partitioned_read_times_out(db_config):
+    db_config.update({'fetch_mode': 'partitioned', 'partition_column': 'id', 'partitions': 2,
+                      'partition_bounds': [1, 100], 'partition_timeout': 0.5})
+    release = threading.Event()
+
+    def make_connection(**kwargs):
+        cursor = Mock()
+        cursor.description = [('id',)]
+        # The partition queries never return
+        cursor.execute.side_effect = lambda query, params=None: release.wait(10)
+        connection = Mock()
+        connection.cursor.return_value = cursor
+        return connection
+
+    with patch('psycopg2.connect', side_effect=make_connection):
+        source = DatabaseSource(db_config)
+        start = time.monotonic()
+        with pytest.raises(TimeoutError):
+            list(source.fetch_data())
+        assert time.monotonic() - start < 5
+    release.set()
+
+def test_keyset_query_with_composite_key():
+    query, params = DatabaseSource.keyset_query("SELECT * FROM t;", ['updated_at', 'id'], 100, ['2024-01-01', 42])
+
+    assert query == ("SELECT * FROM (SELECT * FROM t) AS vetl_keyset "
+                     "WHERE (updated_at > %s) OR (updated_at = %s AND id > %s) ORDER BY updated_at, id LIMIT 100")
+    assert params == ('2024-01-01', '2024-01-01', 42)
+
 def test_local_file_source_connect(local_file_config):
     with patch('os.path.exists', return_value=True):
         source = LocalFileSource(local_file_config)
@@ -100,3 +335,342 @@ def test_local_file_source_read_file(local_file_config):
         file_content = source.read_file('/path/to/test_file.csv')
         assert isinstance(file_content, BytesIO)
 
+
+def test_file_source_fetch_data_yields_batches(tmp_path, monkeypatch):
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    for i in range(5):
+        pd.DataFrame({'text': [f'file {i} row {j}' for j in range(3)]}).to_csv(
+            data_dir / f'part_{i}.csv', index=False)
+
+    monkeypatch.chdir(tmp_path)
+    source = LocalFileSource({
+        'file_path': str(data_dir / 'part_'),
+        'file_batch_size': 2,
+        'chunk_size': 1000,
+        'chunk_overlap': 0
+    })
+    batches = list(source.fetch_data())
+
+    assert [len(batch) for batch in batches] == [6, 6, 3]
+    assert sum(len(batch) for batch in batches) == 15
+    assert not (tmp_path / 'tempfile_downloads').exists()
+
+
+class SlowLocalFileSource(LocalFileSource):
+    def __init__(self, config):
+        super().__init__(config)
+        self.in_flight = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def download_file(self, file_path):
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        # Later files finish first, so completion order differs from listing order
+        time.sleep(0.05 * (5 - int(file_path[-5])))
+        with self.lock:
+            self.in_flight -= 1
+        return super().download_file(file_path)
+
+@pytest.mark.parametrize('preserve_order', [True, False])
+def test_file_source_downloads_concurrently(tmp_path, monkeypatch, preserve_order):
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    for i in range(5):
+        pd.DataFrame({'text': [f'file {i}']}).to_csv(data_dir / f'part_{i}.csv', index=False)
+
+    monkeypatch.chdir(tmp_path)
+    source = SlowLocalFileSource({
+        'file_path': str(data_dir / 'part_'),
+        'download_concurrency': 3,
+        'preserve_file_order': preserve_order
+    })
+    texts = [text for batch in source.fetch_data() for text in batch['text']]
+
+    assert source.peak == 3
+    assert sorted(texts) == [f'file {i}' for i in range(5)]
+    if preserve_order:
+        assert texts == [f'file {path[-5]}' for path in source.list_files()]
+    assert not (tmp_path / 'tempfile_downloads').exists()
+
+    # Local files are parsed in place and left alone
+    assert len(list(data_dir.iterdir())) == 5
+
+
+class FakeRemoteSource(LocalFileSource):
+    """Serves files from a dict of remote path -> bytes, half to disk and half in memory."""
+
+    def __init__(self, config, remote_files):
+        super().__init__(config)
+        self.remote_files = remote_files
+        self.downloaded = []
+
+    def list_files(self):
+        return list(self.remote_files)
+
+    def download_file(self, file_path):
+        if file_path.startswith('memory/'):
+            return BytesIO(self.remote_files[file_path])
+
+        local_path = self.temp_path(file_path)
+        with open(local_path, 'wb') as f:
+            f.write(self.remote_files[file_path])
+        self.downloaded.append(local_path)
+        return local_path
+
+def test_file_source_downloads_to_a_unique_temp_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    source = FakeRemoteSource({'file_path': 'unused', 'temp_dir': str(tmp_path), 'preserve_file_order': True}, {
+        'reports/2023/summary.csv': b'text\nfrom 2023\n',
+        'reports/2024/summary.csv': b'text\nfrom 2024\n',
+        'memory/notes.csv': b'text\nin memory\n',
+    })
+    batches = list(source.fetch_data())
+
+    assert batches[0]['text'].tolist() == ['from 2023', 'from 2024', 'in memory']
+    assert len(set(source.downloaded)) == 2
+    assert all(path.startswith(str(tmp_path / 'vector_etl_')) for path in source.downloaded)
+    assert list(tmp_path.iterdir()) == []
+
+
+class FakeElement:
+    def __init__(self, text, file_name):
+        self.id = f'{file_name}-{text}'
+        self.text = text
+        self.category = 'NarrativeText'
+        self.metadata = Mock(to_dict=Mock(return_value={'filetype': 'text/plain', 'filename': file_name}))
+
+def fake_partition(filename=None, file=None, metadata_filename=None, **kwargs):
+    if filename is None:
+        content, name = file.read().decode(), metadata_filename
+    else:
+        with open(filename) as f:
+            content, name = f.read(), os.path.basename(filename)
+    return [FakeElement(f'{line} parsed by {os.getpid()}', name) for line in content.splitlines()]
+
+def test_file_source_parses_documents_in_worker_processes(tmp_path, monkeypatch):
+    # Parser workers are forked, so they see the patched partition
+    monkeypatch.setattr('vector_etl.source_mods.file_loader.partition', fake_partition)
+    monkeypatch.chdir(tmp_path)
+    source = FakeRemoteSource({'file_path': 'unused', 'parse_workers': 2, 'parse_worker_max_files': 1,
+                               'preserve_file_order': True}, {
+        f'{"memory" if i % 2 else "docs"}/doc_{i}.txt': f'doc {i}'.encode() for i in range(4)
+    })
+    df = pd.concat(source.fetch_data(), ignore_index=True)
+
+    assert [text.split(' parsed')[0] for text in df['text']] == [f'doc {i}' for i in range(4)]
+    assert df['file_name'].tolist() == [f'doc_{i}.txt' for i in range(4)]
+    assert df['id'].str.startswith('doc_').all()
+    pids = {int(text.rsplit(' ', 1)[1]) for text in df['text']}
+    assert os.getpid() not in pids
+    # Each set of workers is retired after two files
+    assert len(pids) >= 2
+    assert source._parser_pool is None
+
+
+class FakePdfElement:
+    def __init__(self, category, text, metadata):
+        self.id = f"{metadata['filename']}-{text}"
+        self.category = category
+        self.text = text
+        self.metadata = Mock(to_dict=Mock(return_value=metadata))
+
+def fake_pdf_partition(filename=None, file=None, metadata_filename=None, starting_page_number=1, **kwargs):
+    """One text element per page, under a title on the first page of the document, set within this call only."""
+    name = metadata_filename or os.path.basename(filename)
+    elements = []
+    title = None
+    for i, _ in enumerate(PdfReader(filename or file).pages):
+        page_number = starting_page_number + i
+        metadata = {'filetype': 'application/pdf', 'filename': name, 'page_number': page_number,
+                    'coordinates': {'points': ((0, 0), (0, 10), (10, 10), (10, 0))}}
+        if page_number == 1:
+            title = FakePdfElement('Title', 'Manual', dict(metadata))
+            elements.append(title)
+        if title is not None:
+            metadata['parent_id'] = title.id
+        elements.append(FakePdfElement('NarrativeText', f'page {page_number}', metadata))
+    return elements
+
+@pytest.mark.parametrize('parse_workers', [1, 2])
+def test_file_source_partitions_large_pdfs_in_page_ranges(tmp_path, monkeypatch, parse_workers):
+    monkeypatch.setattr('vector_etl.source_mods.file_loader.partition', fake_pdf_partition)
+    writer = PdfWriter()
+    for _ in range(5):
+        writer.add_blank_page(width=100, height=100)
+    with open(tmp_path / 'manual.pdf', 'wb') as f:
+        writer.write(f)
+
+    config = {'file_path': str(tmp_path / 'manual.pdf'), 'parse_workers': parse_workers}
+    whole = pd.concat(LocalFileSource(config).fetch_data(), ignore_index=True)
+    split = pd.concat(LocalFileSource({**config, 'pdf_split_pages': 2}).fetch_data(), ignore_index=True)
+
+    assert split['page_number'].tolist() == [1, 1, 2, 3, 4, 5]
+    assert split['text'].tolist() == ['Manual'] + [f'page {i}' for i in range(1, 6)]
+    # Pages 3-5 were partitioned without the title, but still belong to it
+    assert pd.isna(split['parent_id'][0])
+    assert split['parent_id'][1:].tolist() == ['manual.pdf-Manual'] * 5
+    pd.testing.assert_frame_equal(split, whole)
+
+
+def test_column_buffer_keeps_file_order():
+    buffer = ColumnBuffer()
+    for data in [{'text': ['a', 'b'], 'page_number': [1, 2]}, {'text': ['c']}, pd.DataFrame({'text': ['d']}),
+                 {'text': ['e'], 'category': ['Title']}]:
+        buffer.append(data)
+        buffer.end_file()
+
+    assert (buffer.files, len(buffer)) == (4, 5)
+    df = buffer.materialize()
+
+    assert df['text'].tolist() == ['a', 'b', 'c', 'd', 'e']
+    assert df['page_number'].tolist()[:2] == [1, 2]
+    assert df['page_number'].isna().tolist() == [False, False, True, True, True]
+    assert df['category'].isna().tolist() == [True] * 4 + [False]
+    assert (buffer.files, len(buffer)) == (0, 0)
+    assert buffer.materialize().empty
+
+
+@pytest.mark.parametrize('block_size', [1, 3, 7, 1 << 20])
+def test_iter_json_array_matches_json_loads(block_size):
+    items = [12345, -0.5e10, 'a "quoted" ] [ string', {'nested': [1, {'deep': None}], 'text': 'caf\u00e9 \u2603'},
+             [], True, '']
+    document = ('\ufeff  [ ' + ' ,\n '.join(json.dumps(item, ensure_ascii=False) for item in items) + ' ]\n').encode()
+
+    assert list(iter_json_array(BytesIO(document), block_size=block_size)) == items
+    assert list(iter_json_array(BytesIO(b' [ ] '), block_size=block_size)) == []
+
+    with pytest.raises(ValueError):
+        list(iter_json_array(BytesIO(b'[1, 2'), block_size=block_size))
+
+
+@pytest.mark.parametrize('file_name', ['export.csv', 'export.json', 'export.jsonl'])
+def test_file_source_streams_large_files_in_chunks(tmp_path, file_name):
+    rows = [{'id': i, 'text': f'row {i}'} for i in range(25)]
+    path = tmp_path / file_name
+    if file_name.endswith('.csv'):
+        pd.DataFrame(rows).to_csv(path, index=False)
+    elif file_name.endswith('.jsonl'):
+        path.write_text(''.join(json.dumps(row) + '\n' for row in rows))
+    else:
+        path.write_text(json.dumps(rows))
+
+    source = LocalFileSource({'file_path': str(path), 'read_chunk_size': 4, 'batch_size': 10})
+    chunks = list(source.read_chunks(str(path), file_name.split('.')[-1]))
+    assert [len(chunk) for chunk in chunks] == [4] * 6 + [1]
+
+    batches = list(source.fetch_data())
+    # Full batches leave mid-file; the remainder carries over to the end of the file
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+    assert pd.concat(batches)['id'].tolist() == list(range(25))
+
+
+def test_file_source_reads_columnar_files_with_projection_and_filters(tmp_path, monkeypatch):
+    table = pa.table({'id': list(range(10)), 'title': [f'title {i}' for i in range(10)],
+                      'body': [f'body {i}' for i in range(10)], 'year': [2020 + i // 5 for i in range(10)]})
+    (tmp_path / 'data').mkdir()
+    pq.write_table(table, tmp_path / 'data' / 'lake.parquet', row_group_size=3)
+    feather.write_feather(table, str(tmp_path / 'data' / 'lake.feather'))
+
+    config = {'file_path': str(tmp_path / 'data' / 'lake.'), 'filters': [['year', '>=', 2021]],
+              'read_chunk_size': 2, 'preserve_file_order': True}
+    source = LocalFileSource(config)
+    source.project(['title', 'id', 'title', 'missing'])
+
+    chunks = list(source.read_chunks(str(tmp_path / 'data' / 'lake.parquet'), 'parquet'))
+    assert all(len(chunk) <= 2 for chunk in chunks)
+    df = pd.concat(chunks, ignore_index=True)
+    assert df.columns.tolist() == ['title', 'id']
+    assert df['id'].tolist() == [5, 6, 7, 8, 9]
+
+    # Files held in memory are scanned the same way
+    remote = FakeRemoteSource({**config, 'columns': ['body']}, {
+        'memory/lake.feather': (tmp_path / 'data' / 'lake.feather').read_bytes(),
+        'memory/lake.parquet': (tmp_path / 'data' / 'lake.parquet').read_bytes(),
+    })
+    remote.project(['title'])
+    df = pd.concat(remote.fetch_data(), ignore_index=True)
+    assert df.columns.tolist() == ['body']
+    assert df['body'].tolist() == [f'body {i}' for i in range(5, 10)] * 2
+
+
+class FakeBoxFolders:
+    """Box folder listings served two items per page, counting the API calls."""
+
+    def __init__(self, tree):
+        self.tree = tree
+        self.calls = []
+
+    def get_folder_items(self, folder_id, usemarker=None, marker=None, limit=None):
+        self.calls.append(folder_id)
+        items = self.tree[folder_id]
+        start = int(marker or 0)
+        next_marker = str(start + 2) if start + 2 < len(items) else None
+        return Mock(entries=items[start:start + 2], next_marker=next_marker)
+
+def box_item(item_type, item_id, name):
+    item = Mock(type=item_type, id=item_id, sha_1=f'sha-{item_id}')
+    item.name = name
+    return item
+
+def test_box_source_downloads_listed_files_by_id(tmp_path):
+    from vector_etl.source_mods.box_loader import BoxSource
+
+    folders = FakeBoxFolders({
+        '0': [box_item('file', 'f0', 'root.csv'), box_item('folder', '1', 'other'), box_item('folder', '2', 'reports')],
+        '2': [box_item('folder', '3', '2024')],
+        '3': [box_item('file', f'f{i}', f'report_{i}.csv') for i in range(5)] + [box_item('file', 'f9', 'notes.txt')],
+    })
+    downloads = Mock()
+    downloads.download_file.side_effect = lambda file_id: BytesIO(f'text\n{file_id}\n'.encode())
+
+    source = BoxSource({'folder_path': '/reports/2024', 'access_token': 'token', 'file_type': 'csv',
+                        'preserve_file_order': True, 'temp_dir': str(tmp_path)})
+    source.client = Mock(folders=folders, downloads=downloads)
+
+    files = source.list_files()
+    assert files == [f'/reports/2024/report_{i}.csv' for i in range(5)]
+    # Root (2 pages), reports, then 2024 (3 pages)
+    assert folders.calls == ['0', '0', '2', '3', '3', '3']
+
+    batches = list(source.fetch_data())
+    assert batches[0]['text'].tolist() == [f'f{i}' for i in range(5)]
+    assert downloads.download_file.call_count == 5
+    # fetch_data lists the cached folder again; the downloads make no listing calls
+    assert folders.calls[6:] == ['3', '3', '3']
+
+    # A path that was never listed resolves its folder from the cache
+    folders.calls.clear()
+    assert source.file_id('/reports/2024/notes.txt') == 'f9'
+    assert folders.calls == ['3', '3', '3']
+    assert source.file_id('/missing/notes.txt') is None
+
+
+def test_gcs_source_downloads_objects_to_disk(tmp_path):
+    from vector_etl.source_mods.google_cloud_storage import GoogleCloudStorageSource
+
+    objects = {'exports/a.csv': 'text\nfrom a\n', 'exports/b.csv': 'text\nfrom b\n'}
+    downloaded = []
+
+    def blob(name):
+        def download_to_filename(path):
+            downloaded.append(path)
+            with open(path, 'w') as f:
+                f.write(objects[name])
+        return Mock(download_to_filename=download_to_filename)
+
+    bucket = Mock()
+    bucket.list_blobs.return_value = [SimpleNamespace(name=name, generation=1) for name in objects]
+    bucket.blob.side_effect = blob
+
+    source = GoogleCloudStorageSource({'bucket_name': 'bucket', 'prefix': 'exports/', 'file_type': 'csv',
+                                       'preserve_file_order': True, 'temp_dir': str(tmp_path)})
+    source.client = Mock(**{'get_bucket.return_value': bucket})
+    batches = list(source.fetch_data())
+
+    assert batches[0]['text'].tolist() == ['from a', 'from b']
+    assert all(path.startswith(str(tmp_path / 'vector_etl_')) for path in downloaded)
+    bucket.blob.return_value.download_as_bytes.assert_not_called()
+    assert list(tmp_path.iterdir()) == []
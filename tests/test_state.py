@@ -0,0 +1,50 @@
+import datetime
+import decimal
+import pytest
+import numpy as np
+import pandas as pd
+from vector_etl.state import FileManifest, JSONWatermarkStore, SQLiteWatermarkStore, get_watermark_store
+
+
+@pytest.mark.parametrize('store_class, filename', [(SQLiteWatermarkStore, 'watermarks.sqlite'),
+                                                   (JSONWatermarkStore, 'watermarks.json')])
+def test_watermark_store_round_trips_values(tmp_path, store_class, filename):
+    path = str(tmp_path / 'state' / filename)
+    store = store_class(path)
+    values = {
+        'timestamp': pd.Timestamp('2024-05-01 12:30:00'),
+        'date': datetime.date(2024, 5, 1),
+        'sequence': np.int64(42),
+        'amount': decimal.Decimal('10.50'),
+        'name': 'ticket-0042'
+    }
+    for flow, value in values.items():
+        store.set(flow, value)
+    store.close()
+
+    reopened = store_class(path)
+    assert reopened.get('timestamp') == datetime.datetime(2024, 5, 1, 12, 30)
+    assert reopened.get('date') == datetime.date(2024, 5, 1)
+    assert reopened.get('sequence') == 42
+    assert reopened.get('amount') == decimal.Decimal('10.50')
+    assert reopened.get('name') == 'ticket-0042'
+    assert reopened.get('unknown') is None
+
+
+def test_get_watermark_store(tmp_path):
+    assert isinstance(get_watermark_store({'type': 'json', 'path': str(tmp_path / 'w.json')}), JSONWatermarkStore)
+    with pytest.raises(ValueError):
+        get_watermark_store({'type': 'redis'})
+
+
+def test_file_manifest_reports_new_and_changed_files(tmp_path):
+    manifest = FileManifest(str(tmp_path / 'manifest.sqlite'))
+    versions = {'a.csv': '"etag-a"', 'b.csv': 17, 'c.csv': None}
+    assert manifest.changed('bucket', versions) == ['a.csv', 'b.csv', 'c.csv']
+
+    manifest.record('bucket', versions)
+    assert manifest.changed('bucket', versions) == ['c.csv']
+    assert manifest.changed('bucket', {**versions, 'b.csv': 18, 'd.csv': '1'}) == ['b.csv', 'c.csv', 'd.csv']
+    # Other flows keep their own entries
+    assert manifest.changed('other', {'a.csv': '"etag-a"'}) == ['a.csv']
+    manifest.close()
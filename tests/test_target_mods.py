@@ -1,9 +1,15 @@
+import json
 import pytest
 from unittest.mock import Mock, patch
 import pandas as pd
 import numpy as np
 from vector_etl.target_mods.pinecone import PineconeTarget
 from vector_etl.target_mods.qdrant import QdrantTarget
+from vector_etl.target_mods.tembo import TemboTarget
+from vector_etl.target_mods.singlestore import SingleStoreTarget
+from vector_etl.target_mods.lancedb import LanceDBTarget
+from vector_etl.target_mods.neo4j import Neo4jTarget
+from vector_etl.target_mods.mongodb import MongoDBTarget
 
 @pytest.fixture
 def sample_df():
@@ -74,3 +80,107 @@ def test_qdrant_target_write_data(sample_df, qdrant_config):
         call_args = mock_client.upsert.call_args[1]
         assert call_args['collection_name'] == 'test_collection'
         assert len(call_args['points']) == len(sample_df)
+
+
+def test_tembo_target_reuses_connection_across_writes(sample_df):
+    config = {'host': 'localhost', 'database_name': 'vectors', 'username': 'user', 'password': 'pass',
+              'port': 5432, 'schema_name': 'public', 'table_name': 'embeddings'}
+    with patch('psycopg2.connect') as mock_connect, \
+            patch('vector_etl.target_mods.tembo.execute_values') as mock_execute_values:
+        target = TemboTarget(config)
+        target.write_data(sample_df, [], 'test')
+        target.write_data(sample_df, [], 'test')
+
+        mock_connect.assert_called_once()
+        assert mock_execute_values.call_count == 2
+        mock_connect.return_value.close.assert_not_called()
+
+        target.close()
+        mock_connect.return_value.close.assert_called_once()
+
+
+def test_tembo_target_keeps_the_last_row_per_id(sample_df):
+    config = {'host': 'localhost', 'database_name': 'vectors', 'username': 'user', 'password': 'pass',
+              'port': 5432, 'schema_name': 'public', 'table_name': 'embeddings'}
+    df = pd.concat([sample_df, sample_df.assign(text=['updated', 'updated again'])], ignore_index=True)
+    with patch('psycopg2.connect'), patch('vector_etl.target_mods.tembo.execute_values') as mock_execute_values:
+        TemboTarget(config).write_data(df, [], 'test')
+
+        rows = mock_execute_values.call_args.args[2]
+        assert [row[0] for row in rows] == ['uuid1', 'uuid2']
+        assert [json.loads(row[2])['text'] for row in rows] == ['updated', 'updated again']
+
+
+def test_singlestore_target_upserts_by_id(sample_df):
+    config = {'singlestore_username': 'user', 'singlestore_password': 'pass', 'singlestore_host': 'localhost',
+              'singlestore_port': 3306, 'singlestore_database_name': 'vectors', 'singlestore_table': 'embeddings'}
+    with patch('singlestoredb.connect') as mock_connect:
+        cursor = mock_connect.return_value.cursor.return_value.__enter__.return_value
+        cursor.description = [('id',), ('vector',), ('metadata',)]
+        SingleStoreTarget(config).write_data(sample_df, [], 'test')
+
+        statements = [call.args[0] for call in cursor.execute.call_args_list]
+        assert statements[1].endswith("ON DUPLICATE KEY UPDATE vector = VALUES(vector), metadata = VALUES(metadata)")
+        assert [call.args[1][0] for call in cursor.execute.call_args_list[1:]] == ['uuid1', 'uuid2']
+
+
+@pytest.mark.parametrize('table_columns', [['df_uuid', 'vector', 'text'], ['vector', 'text']])
+def test_lancedb_target_merges_on_record_id(sample_df, table_columns):
+    target = LanceDBTarget({'table_name': 'embeddings'})
+    target.db = Mock()
+    table = target.db.open_table.return_value
+    table.schema.names = table_columns
+    sample_df = sample_df.assign(id=['element 1', 'element 2'], __concat_final=sample_df['text'])
+    target.write_data(sample_df, ['text', 'id'], 'test')
+    target.write_data(sample_df, ['text', 'id'], 'test')
+
+    target.db.create_table.assert_not_called()
+    target.db.open_table.assert_called_once()
+    if 'df_uuid' in table_columns:
+        table.merge_insert.assert_called_with('df_uuid')
+        merge = table.merge_insert.return_value
+        records = merge.when_matched_update_all.return_value.when_not_matched_insert_all.return_value.execute.call_args.args[0]
+        table.add.assert_not_called()
+    else:
+        table.merge_insert.assert_not_called()
+        records = table.add.call_args.kwargs['data']
+    assert [record['df_uuid'] for record in records] == ['uuid1', 'uuid2']
+    # A source column named id is kept
+    assert [record['id'] for record in records] == ['element 1', 'element 2']
+
+
+def test_neo4j_target_merges_entities_on_id(caplog):
+    target = Neo4jTarget({'vector_property': 'embedding', 'graph_structure': {
+        'nodes': [{'label': 'Author', 'properties': ['author'], 'unique': True},
+                  {'label': 'Title', 'properties': ['title']}],
+        'relationships': [{'start_node': 'Author', 'end_node': 'Title', 'type': 'WROTE', 'unique': False}]}})
+    query = target.build_cypher_query()
+
+    assert "'unique' option of Neo4j relationships has no effect" in caplog.text
+
+    assert 'MERGE (e:Entity {id: row.id}) SET e.embedding = row.embedding' in query
+    assert 'MERGE (e)-[:HAS_Title]->(n_Title:Title)' in query
+    assert "SET n_Title += {title: row.metadata['title']}" in query
+    assert 'CREATE' not in query
+
+
+@pytest.mark.parametrize('stable_ids', [False, True])
+def test_mongodb_target_upserts_only_stable_ids(sample_df, stable_ids):
+    target = MongoDBTarget({'vector_field': 'embedding'})
+    target.collection = Mock()
+    target.collection.index_information.return_value = {}
+    target.collection.insert_many.return_value = Mock(inserted_ids=[1, 2])
+    target.collection.bulk_write.return_value = Mock(upserted_count=2, matched_count=0)
+    target.stable_ids = stable_ids
+    target.write_data(sample_df, [], 'test')
+
+    index_names = [call.kwargs['name'] for call in target.collection.create_index.call_args_list]
+    if stable_ids:
+        assert 'id_unique' in index_names
+        requests = target.collection.bulk_write.call_args.args[0]
+        assert [request._filter for request in requests] == [{'id': 'uuid1'}, {'id': 'uuid2'}]
+        target.collection.insert_many.assert_not_called()
+    else:
+        assert 'id_unique' not in index_names
+        assert len(target.collection.insert_many.call_args.args[0]) == 2
+        target.collection.bulk_write.assert_not_called()
@@ -0,0 +1,47 @@
+import numpy as np
+
+
+def chunk_offsets(lengths, chunk_size, chunk_overlap):
+    """
+    Compute the chunk layout for a sequence of text lengths.
+
+    Returns two aligned arrays: the position of the parent text for every
+    chunk, and the character offset at which that chunk starts.
+    """
+    step = chunk_size - chunk_overlap
+    if step <= 0:
+        raise ValueError("chunk_overlap must be smaller than chunk_size")
+
+    lengths = np.asarray(lengths, dtype=np.int64)
+    counts = (lengths + step - 1) // step
+
+    parents = np.repeat(np.arange(len(lengths)), counts)
+    # Ordinal of each chunk within its parent text
+    first_chunk = np.repeat(np.cumsum(counts) - counts, counts)
+    ordinals = np.arange(len(parents)) - first_chunk
+
+    return parents, ordinals * step
+
+
+def split_dataframe_column(df, chunk_size, chunk_overlap, column='__concat_final', ordinal_column=None):
+    """
+    Split ``column`` into chunks of ``chunk_size`` characters overlapping by
+    ``chunk_overlap``, one output row per chunk. If ``ordinal_column`` is
+    given, the position of each chunk within its text is stored there.
+
+    The other columns are repeated by position from the parent row, so no
+    per-row Series objects are built. Rows whose value is not a string, or is
+    empty, produce no chunks.
+    """
+    texts = df[column].to_numpy(dtype=object)
+    lengths = [len(text) if isinstance(text, str) else 0 for text in texts]
+
+    parents, starts = chunk_offsets(lengths, chunk_size, chunk_overlap)
+    chunks = [texts[parent][start:start + chunk_size]
+              for parent, start in zip(parents.tolist(), starts.tolist())]
+
+    result = df.take(parents)
+    result[column] = np.array(chunks, dtype=object)
+    if ordinal_column is not None:
+        result[ordinal_column] = starts // (chunk_size - chunk_overlap)
+    return result
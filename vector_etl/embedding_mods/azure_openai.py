@@ -1,43 +1,65 @@
 import pandas as pd
 import logging
 from .base import BaseEmbedding
-from openai import OpenAI
+from openai import AzureOpenAI, AsyncAzureOpenAI
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class AzureOpenAIEmbedding(BaseEmbedding):
+    default_batch_size = 2048
+    max_input_tokens = 8191
+    max_request_tokens = 300000
+
     def __init__(self, config):
         self.config = config
-        self.client = OpenAI(
-            api_key=config['api_key'],
-            api_type='azure',
-            api_version=config.get('version', '2022-12-01'),
-            api_base=config['endpoint']
-        )
-
-    def embed(self, df, embed_column='__concat_final'):
-        logger.info("Starting the Azure OpenAI embedding process...")
+        self.client = AzureOpenAI(**self._client_args())
 
-        text_data = df[embed_column].str.strip().tolist()
+    def _client_args(self):
+        return {
+            'api_key': self.config['api_key'],
+            'api_version': self.config.get('version', '2022-12-01'),
+            'azure_endpoint': self.config['endpoint'],
+            # Retries are handled by BaseEmbedding, not the SDK
+            'max_retries': 0
+        }
 
+    def _model(self):
+        # Azure addresses models by deployment name for private deployments
         if self.config['private_deployment'] == 'No':
-            response = self.client.embeddings.create(
-                input=text_data,
-                model=self.config['model_name'],
-                encoding_format="float"
-            )
+            return self.config['model_name']
         elif self.config['private_deployment'] == 'Yes':
-            response = self.client.embeddings.create(
-                input=text_data,
-                engine=self.config['deployment_name'],
-                encoding_format="float"
-            )
+            return self.config['deployment_name']
         else:
             raise ValueError("Invalid private_deployment configuration")
 
-        embeddings = [item.embedding for item in response.data]
-        df['embeddings'] = embeddings
+    def create_async_client(self):
+        return AsyncAzureOpenAI(**self._client_args())
+
+    def embed_batch(self, texts):
+        response = self.client.embeddings.create(
+            input=texts,
+            model=self._model(),
+            encoding_format="float"
+        )
+        return [item.embedding for item in response.data]
+
+    async def aembed_batch(self, texts, client=None):
+        response = await client.embeddings.create(
+            input=texts,
+            model=self._model(),
+            encoding_format="float"
+        )
+        return [item.embedding for item in response.data]
+
+    def embed(self, df, embed_column='__concat_final'):
+        logger.info("Starting the Azure OpenAI embedding process...")
+
+        text_data = df[embed_column].str.strip().tolist()
+        # Validate the deployment settings before sending any request
+        self._model()
+
+        df['embeddings'] = self.embed_texts(text_data)
 
         logger.info("Completed Azure OpenAI embedding process.")
         return df
@@ -1,6 +1,181 @@
+import asyncio
+import inspect
+import logging
+import threading
 from abc import ABC, abstractmethod
+from .batching import BatchPlanner, load_tokenizer
+from .cache import EmbeddingCache
+from .resilience import AdaptiveConcurrency, RetryPolicy, call_with_retries
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_cache_lock = threading.Lock()
+
+
+def run_coroutine(coro):
+    """
+    Run ``coro`` to completion from synchronous code.
+
+    If the calling thread already has a running event loop (e.g. inside a
+    notebook), the coroutine is run on a fresh loop in a helper thread.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    result = {}
+
+    def runner():
+        try:
+            result['value'] = asyncio.run(coro)
+        except BaseException as e:
+            result['error'] = e
+
+    thread = threading.Thread(target=runner, name='vector-etl-embed')
+    thread.start()
+    thread.join()
+
+    if 'error' in result:
+        raise result['error']
+    return result['value']
+
 
 class BaseEmbedding(ABC):
+    # Provider request limits: inputs per request, tokens per input and
+    # tokens per request (None means no limit)
+    default_batch_size = 100
+    max_input_tokens = None
+    max_request_tokens = None
+
+    default_max_concurrency = 4
+
     @abstractmethod
     def embed(self, df, embed_column='__concat_final'):
         pass
+
+    @property
+    def batch_size(self):
+        return self.config.get('batch_size', self.default_batch_size)
+
+    @property
+    def max_concurrency(self):
+        return self.config.get('max_concurrency', self.default_max_concurrency)
+
+    @property
+    def planner(self):
+        if not hasattr(self, '_planner'):
+            planner = BatchPlanner(
+                max_items=self.batch_size,
+                max_input_tokens=self.config.get('max_input_tokens', self.max_input_tokens),
+                max_request_tokens=self.config.get('max_request_tokens', self.max_request_tokens),
+                overflow=self.config.get('overflow_policy', 'truncate')
+            )
+            if planner.counts_tokens:
+                planner.tokenizer = load_tokenizer(self.config.get('model_name'))
+            self._planner = planner
+        return self._planner
+
+    @property
+    def cache(self):
+        with _cache_lock:
+            if not hasattr(self, '_cache'):
+                self._cache = EmbeddingCache.from_config(self.config.get('cache'))
+        return self._cache
+
+    def cache_namespace(self):
+        """Everything besides the text that determines the embedding."""
+        return (
+            type(self).__name__,
+            self.config.get('model_name'),
+            self.config.get('deployment_name'),
+            self.config.get('dimensions'),
+            self.config.get('overflow_policy', 'truncate')
+        )
+
+    def embed_texts(self, texts):
+        """
+        Embed ``texts`` in batches packed to the provider limits, with up to
+        ``max_concurrency`` requests in flight. Failed requests are retried
+        with backoff, and the concurrency backs off while the provider is
+        rate limiting. Embeddings are returned in input order. When a cache
+        is configured only the texts missing from it are sent to the provider.
+        """
+        cache = self.cache
+        if cache is None:
+            return self._embed_uncached(texts)
+
+        namespace = self.cache_namespace()
+        keys = [cache.make_key(namespace, text) for text in texts]
+        found = cache.get_many(keys)
+
+        # Embed each distinct missing text once
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+
+        if missing:
+            embeddings = self._embed_uncached(list(missing.values()))
+            fresh = dict(zip(missing.keys(), embeddings))
+            cache.put_many(fresh.items())
+            found.update(fresh)
+
+        logger.info(f"Embedding cache: {len(missing)} of {len(texts)} texts sent to the provider "
+                    f"(hits: {cache.hits}, misses: {cache.misses})")
+        return [found[key] for key in keys]
+
+    def _embed_uncached(self, texts):
+        planner = self.planner
+        pieces, origins, token_counts = planner.prepare(texts)
+        batches = [pieces[start:end] for start, end in planner.plan(token_counts)]
+
+        results = run_coroutine(self._embed_batches(batches))
+        embeddings = [embedding for batch in results for embedding in batch]
+        return planner.combine(embeddings, origins, token_counts, len(texts))
+
+    async def _embed_batches(self, batches):
+        # The concurrency limit learned from earlier calls carries over
+        limiter = AdaptiveConcurrency(getattr(self, '_concurrency_limit', self.max_concurrency),
+                                      max_limit=self.max_concurrency)
+        policy = RetryPolicy.from_config(self.config)
+        client = self.create_async_client()
+
+        async def run(batch):
+            return await call_with_retries(lambda: self.aembed_batch(batch, client), limiter, policy)
+
+        try:
+            return await asyncio.gather(*(run(batch) for batch in batches))
+        finally:
+            self._concurrency_limit = limiter.limit
+            await self._close_client(client)
+
+    @staticmethod
+    async def _close_client(client):
+        close = getattr(client, 'aclose', None) or getattr(client, 'close', None)
+        if close is None:
+            return
+        result = close()
+        if inspect.isawaitable(result):
+            await result
+
+    def create_async_client(self):
+        """
+        Return a provider async client for one ``embed_texts`` call, or None
+        if the provider has none. The client is closed when the call ends.
+        """
+        return None
+
+    async def aembed_batch(self, texts, client=None):
+        """
+        Embed one batch. Providers with an async client override this; the
+        default runs ``embed_batch`` on the default thread pool.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.embed_batch, texts)
+
+    @abstractmethod
+    def embed_batch(self, texts):
+        """Embed one batch synchronously and return a list of vectors."""
+        pass
@@ -0,0 +1,170 @@
+import logging
+import math
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ('truncate', 'split', 'error')
+
+
+class TiktokenTokenizer:
+    """Exact token counts for OpenAI models, and a close estimate for others."""
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+
+    @classmethod
+    def load(cls, model_name=None, encoding_name='cl100k_base'):
+        import tiktoken
+
+        if model_name:
+            try:
+                return cls(tiktoken.encoding_for_model(model_name))
+            except KeyError:
+                pass
+        return cls(tiktoken.get_encoding(encoding_name))
+
+    def count(self, texts):
+        return [len(tokens) for tokens in self.encoding.encode_ordinary_batch(texts)]
+
+    def split(self, text, max_tokens):
+        tokens = self.encoding.encode_ordinary(text)
+        return [self.encoding.decode(tokens[i:i + max_tokens]) for i in range(0, len(tokens), max_tokens)]
+
+
+class CharacterTokenizer:
+    """
+    Fallback used when no tokenizer model is available locally. Treats every
+    ``chars_per_token`` characters as one token, which overestimates the
+    token count of typical English text.
+    """
+
+    def __init__(self, chars_per_token=3):
+        self.chars_per_token = chars_per_token
+
+    def count(self, texts):
+        return [math.ceil(len(text) / self.chars_per_token) for text in texts]
+
+    def split(self, text, max_tokens):
+        size = max_tokens * self.chars_per_token
+        return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def load_tokenizer(model_name=None):
+    try:
+        return TiktokenTokenizer.load(model_name)
+    except Exception as e:
+        logger.warning(f"Could not load tiktoken encoding ({str(e)}); estimating token counts from text length")
+        return CharacterTokenizer()
+
+
+class BatchPlanner:
+    """
+    Pack texts into request batches that respect a provider's limits on the
+    number of inputs per request, tokens per input and tokens per request.
+
+    Inputs over the per-input token limit are handled by ``overflow``:
+    ``truncate`` keeps the leading tokens, ``split`` embeds every piece and
+    averages the piece embeddings back into one, ``error`` raises.
+    """
+
+    def __init__(self, max_items, max_input_tokens=None, max_request_tokens=None, overflow='truncate',
+                 tokenizer=None):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unsupported overflow policy: {overflow}")
+
+        self.max_items = max_items
+        self.max_input_tokens = max_input_tokens
+        self.max_request_tokens = max_request_tokens
+        self.overflow = overflow
+        self.tokenizer = tokenizer
+
+    @property
+    def counts_tokens(self):
+        return self.max_input_tokens is not None or self.max_request_tokens is not None
+
+    def prepare(self, texts):
+        """
+        Apply the overflow policy. Returns the texts to send, the index of
+        the original text each one came from, and their token counts.
+        """
+        if not self.counts_tokens:
+            return list(texts), list(range(len(texts))), [0] * len(texts)
+
+        token_counts = self.tokenizer.count(texts)
+        limit = self.max_input_tokens
+
+        if limit is None or all(count <= limit for count in token_counts):
+            return list(texts), list(range(len(texts))), token_counts
+
+        pieces, origins, piece_counts = [], [], []
+        for index, (text, count) in enumerate(zip(texts, token_counts)):
+            if count <= limit:
+                pieces.append(text)
+                origins.append(index)
+                piece_counts.append(count)
+                continue
+
+            if self.overflow == 'error':
+                raise ValueError(f"Input {index} has {count} tokens, more than the limit of {limit}")
+
+            parts = self.tokenizer.split(text, limit)
+            if self.overflow == 'truncate':
+                parts = parts[:1]
+
+            part_counts = self.tokenizer.count(parts)
+            pieces.extend(parts)
+            origins.extend([index] * len(parts))
+            piece_counts.extend(min(part_count, limit) for part_count in part_counts)
+
+        return pieces, origins, piece_counts
+
+    def plan(self, token_counts):
+        """Greedily pack consecutive inputs; returns a list of (start, end) slices."""
+        batches = []
+        start = 0
+        tokens = 0
+
+        for i, count in enumerate(token_counts):
+            full = i - start >= self.max_items
+            over_budget = (self.max_request_tokens is not None and i > start
+                           and tokens + count > self.max_request_tokens)
+            if full or over_budget:
+                batches.append((start, i))
+                start = i
+                tokens = 0
+            tokens += count
+
+        if start < len(token_counts):
+            batches.append((start, len(token_counts)))
+        return batches
+
+    @staticmethod
+    def combine(embeddings, origins, token_counts, n):
+        """
+        Merge piece embeddings back into one embedding per original text,
+        averaging pieces weighted by their token counts.
+        """
+        if len(embeddings) == n:
+            return list(embeddings)
+
+        grouped = [[] for _ in range(n)]
+        for embedding, origin, count in zip(embeddings, origins, token_counts):
+            grouped[origin].append((embedding, count))
+
+        combined = []
+        for parts in grouped:
+            if len(parts) == 1:
+                combined.append(parts[0][0])
+                continue
+            if any(embedding is None for embedding, _ in parts):
+                combined.append(None)
+                continue
+
+            vectors = np.array([embedding for embedding, _ in parts], dtype=np.float64)
+            weights = np.array([max(count, 1) for _, count in parts], dtype=np.float64)
+            average = np.average(vectors, axis=0, weights=weights)
+            norm = np.linalg.norm(average)
+            combined.append((average / norm if norm else average).tolist())
+        return combined
@@ -0,0 +1,173 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join('.vector_etl', 'embedding_cache.sqlite')
+DEFAULT_MAX_SIZE_MB = 1024
+
+# SQLite builds before 3.32 allow at most 999 bound parameters per statement
+_QUERY_CHUNK = 900
+
+# Version 2 stores float32 vectors with their shape; older caches are discarded
+_SCHEMA_VERSION = 2
+
+
+def normalize_text(text):
+    return unicodedata.normalize('NFC', text).strip()
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding store backed by a local SQLite file.
+
+    Entries are keyed by a hash of the embedding namespace (provider, model
+    and dimension options) and the normalized text. When the stored vectors
+    exceed ``max_size_mb`` the least recently used entries are evicted.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_size_mb=DEFAULT_MAX_SIZE_MB):
+        self.path = path
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        if self.connection.execute("PRAGMA user_version").fetchone()[0] < _SCHEMA_VERSION:
+            self.connection.execute("DROP TABLE IF EXISTS embeddings")
+            self.connection.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+        self.connection.execute("""CREATE TABLE IF NOT EXISTS embeddings (
+                                   key TEXT PRIMARY KEY,
+                                   vector BLOB NOT NULL,
+                                   shape TEXT NOT NULL,
+                                   size INTEGER NOT NULL,
+                                   last_used REAL NOT NULL)""")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self.connection.commit()
+
+        # Bytes stored, kept up to date on every write so eviction does not rescan the table
+        self.size_bytes = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+
+    @classmethod
+    def from_config(cls, config):
+        """Build a cache from the embedding ``cache`` option, or return None if it is off."""
+        if not config:
+            return None
+        if config is True:
+            config = {}
+        return cls(path=config.get('path', DEFAULT_CACHE_PATH),
+                   max_size_mb=config.get('max_size_mb', DEFAULT_MAX_SIZE_MB))
+
+    @staticmethod
+    def make_key(namespace, text):
+        payload = json.dumps([list(namespace), normalize_text(text)], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get_many(self, keys):
+        """Return a dict of key -> vector for the keys that are cached."""
+        unique_keys = list(dict.fromkeys(keys))
+        found = {}
+
+        with self._lock:
+            for i in range(0, len(unique_keys), _QUERY_CHUNK):
+                chunk = unique_keys[i:i + _QUERY_CHUNK]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self.connection.execute(
+                    f"SELECT key, vector, shape FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, vector, shape in rows:
+                    found[key] = np.frombuffer(vector, dtype=np.float32).reshape(json.loads(shape)).tolist()
+
+            now = time.time()
+            self.connection.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?",
+                                        [(now, key) for key in found])
+            self.connection.commit()
+
+            self.hits += sum(1 for key in keys if key in found)
+            self.misses += sum(1 for key in keys if key not in found)
+
+        return found
+
+    def put_many(self, items):
+        """
+        Store an iterable of (key, vector) pairs, skipping missing vectors.
+        Vectors are stored as float32 with their shape, so nested (such as
+        per-token) vectors come back nested.
+        """
+        now = time.time()
+        rows = []
+        for key, vector in items:
+            if vector is None:
+                continue
+            array = np.asarray(vector, dtype=np.float32)
+            blob = array.tobytes()
+            rows.append((key, blob, json.dumps(array.shape), len(blob), now))
+
+        if not rows:
+            return
+
+        # A key written twice in one call is stored once, with its last vector
+        rows = list({row[0]: row for row in rows}.values())
+
+        with self._lock:
+            replaced = self._stored_sizes([row[0] for row in rows])
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, shape, size, last_used) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self.size_bytes += sum(row[3] for row in rows) - replaced
+            self._evict()
+            self.connection.commit()
+
+    def _stored_sizes(self, keys):
+        """Total size of the entries already stored under ``keys``."""
+        total = 0
+        for i in range(0, len(keys), _QUERY_CHUNK):
+            chunk = keys[i:i + _QUERY_CHUNK]
+            placeholders = ','.join('?' * len(chunk))
+            total += self.connection.execute(
+                f"SELECT COALESCE(SUM(size), 0) FROM embeddings WHERE key IN ({placeholders})", chunk
+            ).fetchone()[0]
+        return total
+
+    def _evict(self):
+        if self.size_bytes <= self.max_bytes:
+            return
+
+        # Evict down to 90% of the limit so that eviction doesn't run on every write
+        to_free = self.size_bytes - int(self.max_bytes * 0.9)
+        freed = 0
+        evicted = []
+        for key, size in self.connection.execute("SELECT key, size FROM embeddings ORDER BY last_used, rowid"):
+            evicted.append((key,))
+            freed += size
+            if freed >= to_free:
+                break
+
+        self.connection.executemany("DELETE FROM embeddings WHERE key = ?", evicted)
+        self.size_bytes -= freed
+        logger.info(f"Evicted {len(evicted)} entries from the embedding cache")
+
+    def stats(self):
+        with self._lock:
+            entries, size = self.connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM embeddings").fetchone()
+        return {'hits': self.hits, 'misses': self.misses, 'entries': entries, 'size_bytes': size}
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
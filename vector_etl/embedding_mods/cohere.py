@@ -8,22 +8,40 @@ logger = logging.getLogger(__name__)
 
 
 class CohereEmbedding(BaseEmbedding):
+    # Cohere accepts at most 96 texts per embed request and reads the first
+    # 512 tokens of each
+    default_batch_size = 96
+    max_input_tokens = 512
+
     def __init__(self, config):
         self.config = config
         self.client = cohere.Client(config['api_key'])
 
-    def embed(self, df, embed_column='__concat_final'):
-        logger.info("Starting the Cohere embedding process...")
-
-        text_data = df[embed_column].str.strip().tolist()
+    def create_async_client(self):
+        return cohere.AsyncClient(self.config['api_key'])
 
+    def embed_batch(self, texts):
         response = self.client.embed(
-            texts=text_data,
+            texts=texts,
+            model=self.config['model_name'],
+            input_type="classification"
+        )
+        return list(response.embeddings)
+
+    async def aembed_batch(self, texts, client=None):
+        response = await client.embed(
+            texts=texts,
             model=self.config['model_name'],
             input_type="classification"
         )
+        return list(response.embeddings)
+
+    def embed(self, df, embed_column='__concat_final'):
+        logger.info("Starting the Cohere embedding process...")
+
+        text_data = df[embed_column].str.strip().tolist()
 
-        df['embeddings'] = response.embeddings
+        df['embeddings'] = self.embed_texts(text_data)
 
         logger.info("Completed Cohere embedding process.")
         return df
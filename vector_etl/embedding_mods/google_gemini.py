@@ -7,22 +7,33 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class GoogleGeminiEmbedding(BaseEmbedding):
+    default_batch_size = 100
+    max_input_tokens = 2048
+
     def __init__(self, config):
         self.config = config
         genai.configure(api_key=config['api_key'])
 
+    def embed_batch(self, texts):
+        response = genai.embed_content(
+            content=texts,
+            model='models/' + self.config['model_name']
+        )
+        return [item for item in response['embedding']]
+
+    async def aembed_batch(self, texts, client=None):
+        response = await genai.embed_content_async(
+            content=texts,
+            model='models/' + self.config['model_name']
+        )
+        return [item for item in response['embedding']]
+
     def embed(self, df, embed_column='__concat_final'):
         logger.info("Starting the Google Gemini embedding process...")
 
         text_data = df[embed_column].str.strip().tolist()
 
-        response = genai.embed_content(
-            content=text_data,
-            model='models/' + self.config['model_name']
-        )
-
-        embeddings = [item for item in response['embedding']]
-        df['embeddings'] = embeddings
+        df['embeddings'] = self.embed_texts(text_data)
 
         logger.info("Completed Google Gemini embedding process.")
         return df
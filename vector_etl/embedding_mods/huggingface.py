@@ -7,26 +7,33 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class HuggingFaceEmbedding(BaseEmbedding):
+    # The inference API is called once per text
+    default_batch_size = 1
+
     def __init__(self, config):
         self.config = config
         self.api_url = "https://api-inference.huggingface.co/pipeline/feature-extraction/" + config['model_name']
         self.headers = {"Authorization": f"Bearer {config['api_key']}"}
 
-    def embed(self, df, embed_column='__concat_final'):
-        logger.info("Starting the Hugging Face embedding process...")
-
-        text_data = df[embed_column].str.strip().tolist()
+    def embed_batch(self, texts):
         embeddings = []
 
-        for text in text_data:
+        for text in texts:
             response = requests.post(self.api_url, headers=self.headers, json={"inputs": text})
-            if response.status_code == 200:
-                embeddings.append(response.json())
-            else:
+            if response.status_code != 200:
                 logger.error(f"Error in Hugging Face API call: {response.text}")
-                embeddings.append(None)
+                # Raised so the request is retried (or the run fails) instead of storing no embedding
+                response.raise_for_status()
+            embeddings.append(response.json())
+
+        return embeddings
+
+    def embed(self, df, embed_column='__concat_final'):
+        logger.info("Starting the Hugging Face embedding process...")
+
+        text_data = df[embed_column].str.strip().tolist()
 
-        df['embeddings'] = embeddings
+        df['embeddings'] = self.embed_texts(text_data)
 
         logger.info("Completed Hugging Face embedding process.")
         return df
@@ -1,16 +1,40 @@
 import pandas as pd
 import logging
 from .base import BaseEmbedding
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
 class OpenAIEmbedding(BaseEmbedding):
+    default_batch_size = 2048
+    max_input_tokens = 8191
+    max_request_tokens = 300000
+
     def __init__(self, config):
         self.config = config
-        self.client = OpenAI(api_key=config['api_key'])
+        # Retries are handled by BaseEmbedding, not the SDK
+        self.client = OpenAI(api_key=config['api_key'], max_retries=0)
+
+    def create_async_client(self):
+        return AsyncOpenAI(api_key=self.config['api_key'], max_retries=0)
+
+    def embed_batch(self, texts):
+        response = self.client.embeddings.create(
+            input=texts,
+            model=self.config['model_name'],
+            encoding_format="float"
+        )
+        return [item.embedding for item in response.data]
+
+    async def aembed_batch(self, texts, client=None):
+        response = await client.embeddings.create(
+            input=texts,
+            model=self.config['model_name'],
+            encoding_format="float"
+        )
+        return [item.embedding for item in response.data]
 
     def embed(self, df, embed_column='__concat_final'):
         logger.info("Starting the OpenAI embedding process...")
@@ -19,22 +43,7 @@ class OpenAIEmbedding(BaseEmbedding):
         default_value = 'default'
         cleaned_data = [x if x else default_value for x in text_data]
 
-        batch_size = 100
-        embeddings = []
-
-        for i in range(0, len(cleaned_data), batch_size):
-            batch_data = cleaned_data[i:i + batch_size]
-
-            response = self.client.embeddings.create(
-                input=batch_data,
-                model=self.config['model_name'],
-                encoding_format="float"
-            )
-
-            batch_embeddings = [item.embedding for item in response.data]
-            embeddings.extend(batch_embeddings)
-
-        df['embeddings'] = embeddings
+        df['embeddings'] = self.embed_texts(cleaned_data)
 
         logger.info("Completed OpenAI embedding process.")
         return df
@@ -0,0 +1,176 @@
+import asyncio
+import email.utils
+import logging
+import random
+import re
+import time
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+RATE_LIMIT_STATUS_CODES = {429}
+
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|s|m|h)')
+_DURATION_SECONDS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+
+
+def status_code(error):
+    """Best-effort HTTP status of an error raised by any provider SDK."""
+    for attr in ('status_code', 'code', 'http_status'):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+
+    response = getattr(error, 'response', None)
+    value = getattr(response, 'status_code', None)
+    return value if isinstance(value, int) else None
+
+
+def response_headers(error):
+    headers = getattr(error, 'headers', None)
+    if headers is None:
+        headers = getattr(getattr(error, 'response', None), 'headers', None)
+    if not headers:
+        return {}
+    return {str(key).lower(): str(value) for key, value in dict(headers).items()}
+
+
+def parse_duration(value):
+    """Parse '1.5', '20ms', '1s' or '6m0s' style durations into seconds."""
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_SECONDS[unit] for amount, unit in parts)
+
+
+def retry_after(error):
+    """Server-requested wait in seconds, taken from the error's response headers."""
+    headers = response_headers(error)
+
+    if 'retry-after-ms' in headers:
+        seconds = parse_duration(headers['retry-after-ms'])
+        if seconds is not None:
+            return seconds / 1000
+
+    if 'retry-after' in headers:
+        seconds = parse_duration(headers['retry-after'])
+        if seconds is not None:
+            return seconds
+        try:
+            retry_at = email.utils.parsedate_to_datetime(headers['retry-after'])
+            return max(0.0, retry_at.timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass
+
+    # OpenAI-style rate limit headers report when the exhausted budget resets
+    resets = [parse_duration(headers[name]) for name in ('x-ratelimit-reset-requests', 'x-ratelimit-reset-tokens')
+              if name in headers]
+    resets = [seconds for seconds in resets if seconds is not None]
+    return max(resets) if resets else None
+
+
+def is_rate_limited(error):
+    return status_code(error) in RATE_LIMIT_STATUS_CODES
+
+
+def is_retryable(error):
+    code = status_code(error)
+    if code is not None:
+        return code in RETRYABLE_STATUS_CODES
+
+    # Connection resets and timeouts carry no status code
+    if isinstance(error, (ConnectionError, TimeoutError, asyncio.TimeoutError)):
+        return True
+    name = type(error).__name__
+    return 'Timeout' in name or 'Connection' in name
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, overridden by Retry-After when present."""
+
+    def __init__(self, max_retries=6, base_delay=1.0, max_delay=60.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(max_retries=config.get('max_retries', 6),
+                   base_delay=config.get('retry_base_delay', 1.0),
+                   max_delay=config.get('retry_max_delay', 60.0))
+
+    def should_retry(self, error, attempt):
+        return attempt < self.max_retries and is_retryable(error)
+
+    def delay(self, error, attempt):
+        requested = retry_after(error)
+        if requested is not None:
+            return min(requested, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class AdaptiveConcurrency:
+    """
+    Async concurrency limit tuned by additive-increase/multiplicative-decrease.
+
+    Every successful request raises the limit by ``1 / limit`` (about one
+    slot per round of requests); a rate-limited request multiplies it by
+    ``decrease``. Only the first throttled request of a round cuts the
+    limit, so a burst of 429s from requests launched together counts once.
+    """
+
+    def __init__(self, limit, max_limit, min_limit=1, decrease=0.5):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.decrease = decrease
+        self.limit = float(min(max(limit, min_limit), max_limit))
+        self.in_flight = 0
+        self._generation = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+            return self._generation
+
+    async def release(self, generation, throttled=False):
+        async with self._condition:
+            self.in_flight -= 1
+            if throttled:
+                if generation == self._generation:
+                    self.limit = max(self.min_limit, self.limit * self.decrease)
+                    self._generation += 1
+                    logger.info(f"Rate limited; reducing embedding concurrency to {int(self.limit)}")
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+
+async def call_with_retries(call, limiter, policy):
+    """Await ``call()`` under ``limiter``, retrying failures according to ``policy``."""
+    attempt = 0
+    while True:
+        generation = await limiter.acquire()
+        try:
+            result = await call()
+        except Exception as e:
+            await limiter.release(generation, throttled=is_rate_limited(e))
+            if not policy.should_retry(e, attempt):
+                raise
+
+            delay = policy.delay(e, attempt)
+            attempt += 1
+            logger.warning(f"Embedding request failed ({str(e)}); retry {attempt} of "
+                           f"{policy.max_retries} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            continue
+
+        await limiter.release(generation)
+        return result
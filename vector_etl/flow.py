@@ -17,6 +17,9 @@ class Flow:
     def set_embed_columns(self, embed_columns_config):
         self.config['embed_columns'] = embed_columns_config
 
+    def set_pipeline(self, pipeline_config):
+        self.config['pipeline'] = pipeline_config
+
     def load_yaml(self, yaml_path):
         with open(yaml_path, 'r') as file:
             self.config = yaml.safe_load(file)
@@ -0,0 +1,43 @@
+import hashlib
+import os
+import uuid
+import numpy as np
+
+# Namespace for the name-based (version 5) record IDs minted by VectorETL
+VECTOR_ETL_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, 'https://github.com/ContextData/VectorETL')
+
+ID_STRATEGIES = ('random', 'columns', 'ordinal')
+
+_UUID_HEX_POSITIONS = [i for i in range(36) if i not in (8, 13, 18, 23)]
+
+
+def generate_uuids(n):
+    """Generate ``n`` random (version 4) UUID strings in one shot."""
+    raw = np.frombuffer(os.urandom(16 * n), dtype=np.uint8).reshape(n, 16).copy()
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40  # version 4
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80  # RFC 4122 variant
+
+    hex_chars = np.frombuffer(raw.tobytes().hex().encode('ascii'), dtype=np.uint8).reshape(n, 32)
+    formatted = np.full((n, 36), ord('-'), dtype=np.uint8)
+    formatted[:, _UUID_HEX_POSITIONS] = hex_chars
+
+    return np.frombuffer(formatted.tobytes(), dtype='S36').astype(str).tolist()
+
+
+def stable_uuids(record_keys, chunk_ordinals):
+    """
+    Derive a version 5 UUID for every chunk from its record key and its
+    ordinal within the record. The same inputs always give the same IDs.
+    """
+    return [str(uuid.uuid5(VECTOR_ETL_NAMESPACE, f"{key}#{ordinal}"))
+            for key, ordinal in zip(record_keys, chunk_ordinals)]
+
+
+def content_hashes(df, columns):
+    """Hash the values of ``columns`` for every row of ``df``."""
+    payload = np.full(len(df), '', dtype=object)
+    for col in columns:
+        values = df[col].astype(object).astype(str).to_numpy(dtype=object)
+        payload = payload + '\x1f' + values
+
+    return [hashlib.sha256(text.encode('utf-8')).hexdigest() for text in payload]
@@ -35,7 +35,8 @@ def main():
         run_etl_process(config['source'],
                         config['embedding'],
                         config['target'],
-                        config['embed_columns'])
+                        config['embed_columns'],
+                        config.get('pipeline'))
 
     except Exception as e:
         logger.error(f"An error occurred: {str(e)}")
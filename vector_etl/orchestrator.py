@@ -1,7 +1,12 @@
 import logging
+import numpy as np
 import pandas as pd
-import uuid
 import requests
+import threading
+from vector_etl.chunking import split_dataframe_column
+from vector_etl.ids import ID_STRATEGIES, content_hashes, generate_uuids, stable_uuids
+from vector_etl.pipeline import Pipeline
+from vector_etl.state import ChangeLedger
 from vector_etl.source_mods import get_source_class
 from vector_etl.embedding_mods import get_embedding_model
 from vector_etl.target_mods import get_target_database
@@ -9,9 +14,12 @@ from vector_etl.target_mods import get_target_database
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def format_column_name(name):
+    return ''.join(word.capitalize() for word in name.split('_'))
+
 
 class ETLOrchestrator:
-    def __init__(self, source_config, embedding_config, target_config, embed_columns):
+    def __init__(self, source_config, embedding_config, target_config, embed_columns, pipeline_config=None):
         self.source = get_source_class(source_config)
         self.embedding = get_embedding_model(embedding_config)
         self.target = get_target_database(target_config)
@@ -19,34 +27,70 @@ class ETLOrchestrator:
         self.embedding_config = embedding_config
         self.target_config = target_config
         self.embed_columns = embed_columns
+        self.pipeline_config = pipeline_config or {}
+
+        self.id_strategy = source_config.get('id_strategy', 'random')
+        if self.id_strategy not in ID_STRATEGIES:
+            raise ValueError(f"Unsupported id_strategy: {self.id_strategy}")
+        if self.id_strategy == 'columns' and not source_config.get('id_columns'):
+            raise ValueError("id_strategy 'columns' requires id_columns")
+        # Row positions restart at 0 on every run, so they only identify rows when every run reads everything
+        if self.id_strategy == 'ordinal' and (source_config.get('watermark_column')
+                                              or source_config.get('skip_unchanged_files')):
+            raise ValueError("id_strategy 'ordinal' cannot be combined with watermark_column or "
+                             "skip_unchanged_files; use id_strategy 'columns'")
+
+        self.target.stable_ids = self.id_strategy != 'random'
+
+        # With metadata_columns listed, columnar sources only decode the columns that are used.
+        # Without embed_columns every column is embedded, so nothing can be left out.
+        if source_config.get('metadata_columns') is not None and len(embed_columns) > 0:
+            self.source.project(list(embed_columns) + list(source_config['metadata_columns'])
+                                + list(source_config.get('id_columns') or []))
+
+        self.ledger = ChangeLedger.from_config(source_config.get('skip_unchanged'))
+        if self.ledger is not None and self.id_strategy == 'random':
+            logger.warning("skip_unchanged has no effect with random IDs; set id_strategy to 'columns' or 'ordinal'")
+
+        self._watermark_lock = threading.Lock()
+        self._watermark_high = None
+        self._watermark_checkpoints = False
+
+        self._files_lock = threading.Lock()
+        self._files_written = {}
+        self._file_checkpoints = False
 
     def run(self):
         logger.info("Starting ETL process...")
 
         try:
-
-            if self.source_config['source_data_type'] == 'database':
-
-                # Fetch data from source in batches
-                for df_batch in self.fetch_data():
-                    if df_batch.empty: #len(df_batch) == 0: #df_batch.empty:
-                        logger.info("No new data to process in this batch. Continuing...")
-                        continue
-
+            batches = self.fetch_batches()
+
+            self._watermark_high = None
+            self._watermark_checkpoints = (self.incremental and self.writes_in_order()
+                                           and self.source.watermark_ordered)
+            self._files_written = {}
+            self._file_checkpoints = self.writes_in_order()
+
+            if self.pipeline_config.get('mode') == 'pipelined':
+                logger.info("Running fetch, embed and write stages concurrently...")
+                pipeline = Pipeline.from_config(self.process_and_embed_data,
+                                                self.write_to_target,
+                                                self.pipeline_config)
+                pipeline.run(batches)
+            else:
+                for df_batch in batches:
                     # Process and embed data
                     df_batch = self.process_and_embed_data(df_batch)
 
                     # Write data to target
                     self.write_to_target(df_batch)
 
-            else:
-                df = self.fetch_data()
-                if df.empty:
-                    logger.info("No new data to process. Exiting.")
-                    return
-
-                df = self.process_and_embed_data(df)
-                self.write_to_target(df)
+            # Every batch is in the target, so the run's highest watermark is safe to commit
+            if self._watermark_high is not None:
+                self.source.update_db_watermark(self._watermark_high)
+            if self._files_written:
+                self.source.commit_files(self._files_written)
 
             logger.info("ETL process completed successfully.")
 
@@ -54,12 +98,50 @@ class ETLOrchestrator:
             logger.error(f"ETL process failed: {str(e)}")
             raise
 
+        finally:
+            # Connections are pooled for the length of a run
+            self.source.close()
+            self.target.close()
+
     def fetch_data(self):
         logger.info(f"Fetching data from {self.source_config['source_data_type']}...")
         return self.source.fetch_data()
 
+    def fetch_batches(self):
+        data = self.fetch_data()
+
+        # Database and file sources yield batches; the API sources
+        # return a single DataFrame, which is handled as one batch.
+        batches = [data] if isinstance(data, pd.DataFrame) else data
+
+        row_offset = 0
+        try:
+            for df_batch in batches:
+                if df_batch.empty:
+                    logger.info("No new data to process in this batch. Continuing...")
+                    # Files without content have nothing to write
+                    self.advance_files(df_batch.attrs.get('files'))
+                    continue
+
+                # Position of the batch in the source, used by the 'ordinal' ID strategy
+                df_batch.attrs['row_offset'] = row_offset
+                row_offset += len(df_batch)
+
+                if self.incremental:
+                    df_batch.attrs['watermark'] = self.source.batch_watermark(df_batch)
+                yield df_batch
+        finally:
+            close = getattr(batches, 'close', None)
+            if close is not None:
+                close()
+
     def process_and_embed_data(self, df):
         logger.info("Processing and embedding data...")
+        watermark = df.attrs.get('watermark')
+        files = df.attrs.get('files')
+
+        # Record keys are derived from the source columns, so take them first
+        record_keys = self.record_keys(df)
 
         # Generate concatenated column
         df = self.generate_concatenation(df)
@@ -67,62 +149,187 @@ class ETLOrchestrator:
         # Split data into chunks if necessary
         chunk_size = self.source_config.get('chunk_size', 1000)
         chunk_overlap = self.source_config.get('chunk_overlap', 0)
-        df = self.split_dataframe_column(df, chunk_size, chunk_overlap)
+
+        if record_keys is None:
+            df = self.split_dataframe_column(df, chunk_size, chunk_overlap)
+        else:
+            df['__record_key'] = record_keys
+            df = self.split_dataframe_column(df, chunk_size, chunk_overlap, ordinal_column='__chunk_ordinal')
+            df['df_uuid'] = stable_uuids(df['__record_key'].tolist(), df['__chunk_ordinal'].tolist())
+            df = df.drop(columns=['__record_key', '__chunk_ordinal'])
+
+        if self.ledger is not None:
+            df = self.drop_unchanged(df)
+            if df.empty:
+                logger.info("All chunks in this batch are unchanged. Skipping embedding.")
+                df.attrs['watermark'] = watermark
+                df.attrs['files'] = files
+                return df
 
         # Generate embeddings
         df = self.embedding.embed(df)
 
+        df.attrs['watermark'] = watermark
+        df.attrs['files'] = files
         return df
 
     def write_to_target(self, df):
+        watermark = df.attrs.get('watermark')
+        files = df.attrs.get('files')
+        content_hash = None
+        if '__content_hash' in df.columns:
+            content_hash = df['__content_hash'].tolist()
+            df = df.drop(columns=['__content_hash'])
+
+        if df.empty:
+            logger.info("Nothing to write in this batch.")
+            self.advance_watermark(watermark)
+            self.advance_files(files)
+            return
+
         logger.info(f"Writing data to {self.target_config['target_database']}...")
         domain = self.source_config.get('table', self.source_config.get('source_data_type'))
 
-        self.target.write_data(df, self.embed_columns, domain)
+        # Each write gets its own copy: targets append to the column list while
+        # building metadata, and writes may run concurrently.
+        self.target.write_data(df, list(self.embed_columns), domain)
+
+        # Only remember the content once the target has it
+        if content_hash is not None:
+            self.ledger.record(self.target_scope(), df['df_uuid'].tolist(), content_hash)
+
+        self.advance_watermark(watermark)
+        self.advance_files(files)
+
+    @property
+    def incremental(self):
+        return bool(self.source_config.get('watermark_column'))
+
+    def writes_in_order(self):
+        """True when batches reach the target in the order they were fetched."""
+        if self.pipeline_config.get('mode') != 'pipelined':
+            return True
+        return (self.pipeline_config.get('preserve_order', False)
+                or (self.pipeline_config.get('embed_workers', 1) == 1
+                    and self.pipeline_config.get('write_workers', 1) == 1))
+
+    def advance_watermark(self, watermark):
+        """
+        Note the watermark of a batch that is now in the target. The run's
+        highest watermark is committed once every batch is written; when
+        batches are fetched and written in watermark order, the batch's
+        checkpoint is committed straight away so an interrupted run resumes
+        close to where it stopped.
+        """
+        if watermark is None:
+            return
+
+        checkpoint, high = watermark
+        with self._watermark_lock:
+            if self._watermark_high is None or high > self._watermark_high:
+                self._watermark_high = high
+            if self._watermark_checkpoints and checkpoint is not None:
+                self.source.update_db_watermark(checkpoint)
+
+    def advance_files(self, files):
+        """
+        Note the source files (path -> version) completed by a batch that is
+        now in the target. When batches are written in the order they were
+        fetched they are committed to the file manifest straight away;
+        otherwise they are committed once every batch is written.
+        """
+        if not files:
+            return
+
+        with self._files_lock:
+            if self._file_checkpoints:
+                self.source.commit_files(files)
+            else:
+                self._files_written.update(files)
+
+    def source_identity(self, include_query=True):
+        """
+        Identify the source in record keys: ``flow_name`` if set, otherwise
+        the connection, table and location options. Keys built from id
+        columns leave the query out, so editing the SQL keeps the same IDs.
+        """
+        if self.source_config.get('flow_name'):
+            return str(self.source_config['flow_name'])
+
+        keys = ('source_data_type', 'db_type', 'database_name', 'table', 'query',
+                'bucket_name', 'prefix', 'folder_path', 'folder_id', 'file_path')
+        if not include_query:
+            keys = tuple(key for key in keys if key != 'query')
+        return ':'.join(str(self.source_config[key]) for key in keys if self.source_config.get(key))
+
+    def target_scope(self):
+        keys = ('target_database', 'index_name', 'collection_name', 'schema_name', 'table_name',
+                'singlestore_table', 'class_name')
+        return ':'.join(str(self.target_config[key]) for key in keys if self.target_config.get(key))
+
+    def record_keys(self, df):
+        """
+        Return a stable key for every row of ``df`` according to the
+        configured ``id_strategy``, or None when IDs are random.
+        """
+        if self.id_strategy == 'random':
+            return None
+
+        if self.id_strategy == 'columns':
+            keys = np.full(len(df), self.source_identity(include_query=False), dtype=object)
+            for col in self.source_config['id_columns']:
+                keys = keys + '\x1f' + df[col].astype(object).astype(str).to_numpy(dtype=object)
+            return keys
+
+        # 'ordinal': the row's position in the source stream, which depends on the query
+        identity = self.source_identity()
+        offset = df.attrs.get('row_offset', 0)
+        return [f"{identity}\x1f{i}" for i in range(offset, offset + len(df))]
+
+    def drop_unchanged(self, df):
+        content_hash = content_hashes(df, [col for col in df.columns if col != 'df_uuid'])
+        changed = np.array(self.ledger.changed(self.target_scope(), df['df_uuid'].tolist(), content_hash),
+                           dtype=bool)
+
+        logger.info(f"{len(df) - changed.sum()} of {len(df)} chunks unchanged since the last run")
+
+        df = df[changed].copy()
+        df['__content_hash'] = np.array(content_hash, dtype=object)[changed]
+        return df
 
     def generate_concatenation(self, df):
-        def format_column_name(name):
-            return ''.join(word.capitalize() for word in name.split('_'))
-
-        if len(self.embed_columns) > 0:
-            df['__concat_final'] = df.apply(
-                lambda row: ' ~ '.join(f"{format_column_name(col)}: {row[col]}"
-                                       for col in self.embed_columns if pd.notna(row[col])),
-                                       axis=1
-            )
-        else:
-            df_columns = df.columns.to_list()
-            df['__concat_final'] = df.apply(
-                lambda row: ' ~ '.join(f"{format_column_name(col)}: {row[col]}"
-                                       for col in df_columns if pd.notna(row[col])),
-                axis=1
-            )
-
-        df['df_uuid'] = [str(uuid.uuid4()) for _ in range(len(df))]
-        return df
+        columns = self.embed_columns if len(self.embed_columns) > 0 else df.columns.to_list()
 
-    def split_dataframe_column(self, df, chunk_size, chunk_overlap):
-        logger.info("Splitting dataframe into chunks...")
+        # Build the text column-wise: each column contributes "Name: value" to the
+        # rows where it is not null, joined to earlier columns with ' ~ '.
+        concat = np.full(len(df), '', dtype=object)
+        started = np.zeros(len(df), dtype=bool)
+
+        for col in columns:
+            present = df[col].notna().to_numpy()
+            if not present.any():
+                continue
 
-        def split_text(text, size, overlap):
-            if not isinstance(text, str):
-                return []
-            return [text[i:i + size] for i in range(0, len(text), size - overlap) if text[i:i + size]]
+            values = df[col][present].astype(object).astype(str).to_numpy(dtype=object)
+            pieces = f"{format_column_name(col)}: " + values
+            joiners = np.where(started[present], ' ~ ', '').astype(object)
 
-        new_rows = []
-        for _, row in df.iterrows():
-            chunks = split_text(row['__concat_final'], chunk_size, chunk_overlap)
-            for chunk in chunks:
-                if chunk:
-                    new_row = row.copy()
-                    new_row['__concat_final'] = chunk
-                    new_rows.append(new_row)
+            concat[present] = concat[present] + joiners + pieces
+            started |= present
 
-        return pd.DataFrame(new_rows, columns=df.columns)
+        df['__concat_final'] = concat
+        df['df_uuid'] = generate_uuids(len(df))
+        return df
+
+    def split_dataframe_column(self, df, chunk_size, chunk_overlap, ordinal_column=None):
+        logger.info("Splitting dataframe into chunks...")
+        return split_dataframe_column(df, chunk_size, chunk_overlap, column='__concat_final',
+                                      ordinal_column=ordinal_column)
 
 
-def run_etl_process(source_config, embedding_config, target_config, embed_columns):
-    orchestrator = ETLOrchestrator(source_config, embedding_config, target_config, embed_columns)
+def run_etl_process(source_config, embedding_config, target_config, embed_columns, pipeline_config=None):
+    orchestrator = ETLOrchestrator(source_config, embedding_config, target_config, embed_columns,
+                                   pipeline_config)
     orchestrator.run()
 
 def run_etl_process_py(config):
@@ -131,9 +338,11 @@ def run_etl_process_py(config):
     embedding_config = config['embedding']
     target_config = config['target']
     embed_columns = config.get('embed_columns', [])
+    pipeline_config = config.get('pipeline')
 
     orchestrator = ETLOrchestrator(source_config,
                                    embedding_config,
                                    target_config,
-                                   embed_columns)
+                                   embed_columns,
+                                   pipeline_config)
     orchestrator.run()
@@ -0,0 +1,191 @@
+import logging
+import queue
+import threading
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+_POLL_INTERVAL = 0.1
+
+
+class Pipeline:
+    """
+    Run the fetch, process and write stages of an ETL run concurrently.
+
+    The stages are joined by bounded queues, so at most ``queue_depth``
+    batches wait between two stages. Fetching happens on a single thread;
+    processing and writing each use their own pool of worker threads. The
+    first error raised by any stage stops every worker and is re-raised from
+    ``run``.
+    """
+
+    def __init__(self, process, write, queue_depth=2, process_workers=1, write_workers=1,
+                 preserve_order=False):
+        if queue_depth < 1 or process_workers < 1 or write_workers < 1:
+            raise ValueError("queue_depth and worker counts must be at least 1")
+
+        if preserve_order and write_workers > 1:
+            logger.warning("preserve_order requires a single writer; ignoring write_workers")
+            write_workers = 1
+
+        self.process = process
+        self.write = write
+        self.queue_depth = queue_depth
+        self.process_workers = process_workers
+        self.write_workers = write_workers
+        self.preserve_order = preserve_order
+
+        self._stop = threading.Event()
+        self._errors = []
+        self._lock = threading.Lock()
+        self._active_processors = 0
+        # With preserve_order: sequence number of the next batch to write
+        self._next_write = 0
+        self._written = threading.Condition()
+
+    @classmethod
+    def from_config(cls, process, write, config):
+        return cls(
+            process,
+            write,
+            queue_depth=config.get('queue_depth', 2),
+            process_workers=config.get('embed_workers', 1),
+            write_workers=config.get('write_workers', 1),
+            preserve_order=config.get('preserve_order', False)
+        )
+
+    def run(self, batches):
+        self._stop.clear()
+        self._errors = []
+        self._active_processors = self.process_workers
+        self._next_write = 0
+
+        fetched = queue.Queue(self.queue_depth)
+        processed = queue.Queue(self.queue_depth)
+
+        threads = [threading.Thread(target=self._fetch, args=(batches, fetched),
+                                    name='vector-etl-fetch', daemon=True)]
+        threads += [threading.Thread(target=self._process, args=(fetched, processed),
+                                     name=f'vector-etl-process-{i}', daemon=True)
+                    for i in range(self.process_workers)]
+        threads += [threading.Thread(target=self._write, args=(processed,),
+                                     name=f'vector-etl-write-{i}', daemon=True)
+                    for i in range(self.write_workers)]
+
+        for thread in threads:
+            thread.start()
+
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(_POLL_INTERVAL)
+        except BaseException:
+            self._stop.set()
+            raise
+
+        if self._errors:
+            raise self._errors[0]
+
+    def _wait_for_turn(self, seq):
+        """
+        Hold a processed batch until it is within ``queue_depth`` of the next
+        batch to write, so a slow batch cannot make the writer buffer every
+        batch behind it. Returns False if the pipeline stopped.
+        """
+        with self._written:
+            while seq >= self._next_write + self.queue_depth:
+                if self._stop.is_set():
+                    return False
+                self._written.wait(_POLL_INTERVAL)
+        return not self._stop.is_set()
+
+    def _fail(self, error):
+        with self._lock:
+            self._errors.append(error)
+        logger.error(f"Pipeline stage {threading.current_thread().name} failed: {str(error)}")
+        self._stop.set()
+
+    def _put(self, q, item):
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _fetch(self, batches, fetched):
+        try:
+            for seq, batch in enumerate(batches):
+                if not self._put(fetched, (seq, batch)):
+                    return
+        except Exception as e:
+            self._fail(e)
+            return
+        finally:
+            close = getattr(batches, 'close', None)
+            if close is not None:
+                close()
+
+        for _ in range(self.process_workers):
+            self._put(fetched, _DONE)
+
+    def _process(self, fetched, processed):
+        try:
+            while True:
+                item = self._get(fetched)
+                if item is _DONE:
+                    break
+
+                seq, batch = item
+                batch = self.process(batch)
+                if self.preserve_order and not self._wait_for_turn(seq):
+                    return
+                if not self._put(processed, (seq, batch)):
+                    return
+        except Exception as e:
+            self._fail(e)
+            return
+
+        # The last processor to finish tells the writers there is no more work
+        with self._lock:
+            self._active_processors -= 1
+            last = self._active_processors == 0
+
+        if last:
+            for _ in range(self.write_workers):
+                self._put(processed, _DONE)
+
+    def _write(self, processed):
+        pending = {}
+        next_seq = 0
+
+        try:
+            while True:
+                item = self._get(processed)
+                if item is _DONE:
+                    break
+
+                if not self.preserve_order:
+                    self.write(item[1])
+                    continue
+
+                seq, batch = item
+                pending[seq] = batch
+                while next_seq in pending:
+                    self.write(pending.pop(next_seq))
+                    next_seq += 1
+                    with self._written:
+                        self._next_write = next_seq
+                        self._written.notify_all()
+        except Exception as e:
+            self._fail(e)
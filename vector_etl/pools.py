@@ -0,0 +1,181 @@
+import logging
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# DB-API error classes that mean the connection itself is unusable
+_DISCONNECT_ERRORS = ('OperationalError', 'InterfaceError')
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of DB-API connections.
+
+    Connections are opened on demand up to ``max_size`` and handed back to
+    the pool when released, so later batches reuse them instead of paying
+    for a new TCP, TLS and authentication handshake. A connection that has
+    been idle for longer than ``health_check_interval`` seconds is pinged
+    before it is reused, and replaced if the ping fails.
+    """
+
+    def __init__(self, connect, max_size=4, health_check_interval=30.0):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+
+        self.connect = connect
+        self.max_size = max_size
+        self.health_check_interval = health_check_interval
+
+        self._idle = []
+        self._size = 0
+        self._condition = threading.Condition()
+
+    @classmethod
+    def from_config(cls, connect, config, max_size=4):
+        return cls(connect,
+                   max_size=config.get('pool_size', max_size),
+                   health_check_interval=config.get('pool_health_check_interval', 30.0))
+
+    def acquire(self):
+        while True:
+            with self._condition:
+                while not self._idle and self._size >= self.max_size:
+                    self._condition.wait()
+
+                if self._idle:
+                    connection, released_at = self._idle.pop()
+                else:
+                    connection, released_at = None, None
+                    self._size += 1
+
+            if connection is None:
+                try:
+                    return self.connect()
+                except Exception:
+                    self._forget()
+                    raise
+
+            if self._healthy(connection, released_at):
+                return connection
+
+            logger.info("Replacing a pooled connection that failed its health check")
+            self._close(connection)
+            self._forget()
+
+    def release(self, connection, discard=False):
+        """Return a connection to the pool, ending any open transaction, or close it if ``discard``."""
+        if not discard:
+            try:
+                connection.rollback()
+            except Exception:
+                discard = True
+
+        if discard:
+            self._close(connection)
+            self._forget()
+            return
+
+        with self._condition:
+            self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self):
+        connection = self.acquire()
+        discard = False
+        try:
+            yield connection
+        except Exception as e:
+            discard = type(e).__name__ in _DISCONNECT_ERRORS
+            raise
+        finally:
+            # Also released when a generator holding it is closed, or on KeyboardInterrupt
+            self.release(connection, discard=discard)
+
+    def close(self):
+        """Close the idle connections. Connections in use are closed when released."""
+        with self._condition:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._condition.notify_all()
+
+        for connection, _ in idle:
+            self._close(connection)
+
+    def _forget(self):
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    def _healthy(self, connection, released_at):
+        # psycopg2 reports a closed connection with a non-zero 'closed' attribute
+        closed = getattr(connection, 'closed', 0)
+        if isinstance(closed, int) and closed:
+            return False
+
+        if time.monotonic() - released_at < self.health_check_interval:
+            return True
+
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+            cursor.close()
+            connection.rollback()
+            return True
+        except Exception as e:
+            logger.warning(f"Pooled connection health check failed: {str(e)}")
+            return False
+
+    @staticmethod
+    def _close(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+class ProcessPool:
+    """
+    Pool of worker processes for CPU-bound work that holds the GIL.
+
+    Executors are started lazily. Once ``workers * max_tasks_per_worker``
+    tasks have been submitted to one executor, later tasks go to a fresh
+    one and the old executor shuts down after finishing its queue, so
+    memory leaked by long-lived workers is returned to the system.
+    """
+
+    def __init__(self, workers, max_tasks_per_worker=None):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+
+        self.workers = workers
+        self.max_tasks_per_worker = max_tasks_per_worker
+
+        self._executor = None
+        self._submitted = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        with self._lock:
+            if self._executor is None or self._exhausted():
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False)
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                self._submitted = 0
+
+            self._submitted += 1
+            return self._executor.submit(fn, *args, **kwargs)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def _exhausted(self):
+        return bool(self.max_tasks_per_worker) and self._submitted >= self.workers * self.max_tasks_per_worker
@@ -8,3 +8,11 @@ class BaseSource(ABC):
     @abstractmethod
     def fetch_data(self):
         pass
+
+    def close(self):
+        """Release connections held between runs."""
+        pass
+
+    def project(self, columns):
+        """Read only ``columns`` where the source can skip the others. Sources that cannot ignore this."""
+        pass
@@ -8,6 +8,9 @@ from .file_loader import FileBaseSource
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Items requested per folder listing page (the most Box returns)
+FOLDER_PAGE_SIZE = 1000
+
 class BoxSource(FileBaseSource):
     def __init__(self, config):
         super().__init__(config)
@@ -15,6 +18,9 @@ class BoxSource(FileBaseSource):
         self.folder_path = config['folder_path']
         self.access_token = config['access_token']
         self.file_type = config.get('file_type', '')
+        # Box addresses files and folders by ID; paths resolved so far
+        self._folder_ids = {'': '0'}
+        self._file_ids = {}
 
     def connect(self):
         logger.info("Connecting to Box...")
@@ -28,35 +34,70 @@ class BoxSource(FileBaseSource):
 
         logger.info(f"Listing files in Box folder: {self.folder_path}")
 
-        path_parts = self.folder_path.strip('/').split('/')
-
-        # Start from the root folder
-        current_folder_id = '0'
-
-        # Traverse the path
-        for part in path_parts:
-            items = self.client.folders.get_folder_items(current_folder_id).entries
-            found = False
-            for item in items:
-                if item.type == 'folder' and item.name == part:
-                    current_folder_id = item.id
-                    found = True
-                    break
-            if not found:
-                logger.info(f"Subfolder '{part}' not found in the specified path.")
-                return
+        folder_id = self.folder_id(self.folder_path)
+        if folder_id is None:
+            return
 
-        # List files in the final subfolder
-        items = self.client.folders.get_folder_items(current_folder_id).entries
+        # List files in the final subfolder, keeping their IDs for the download
         files = []
-        for item in items:
+        for item in self.folder_items(folder_id):
             if item.type == 'file':
                 if item.name.endswith(self.file_type):
                     logger.info(f"File: {item.name}")
-                    files.append(os.path.join(self.folder_path, item.name))
-        print(files)
+                    file_path = os.path.join(self.folder_path, item.name)
+                    files.append(file_path)
+                    self._file_ids[file_path] = item.id
+                    self.file_versions[file_path] = getattr(item, 'sha_1', None) or getattr(item, 'etag', None)
+        logger.debug(f"Files listed: {files}")
         return files
 
+    def folder_items(self, folder_id):
+        """Yield every item in a Box folder, following the listing's marker from page to page."""
+        marker = None
+        while True:
+            page = self.client.folders.get_folder_items(folder_id, usemarker=True, marker=marker,
+                                                        limit=FOLDER_PAGE_SIZE)
+            yield from page.entries or []
+            marker = page.next_marker
+            if not marker:
+                return
+
+    def folder_id(self, folder_path):
+        """
+        Resolve a folder path to its Box ID, walking down from the root folder.
+        Every subfolder seen on the way is cached, so a path is only walked once.
+        """
+        parts = [part for part in folder_path.strip('/').split('/') if part]
+
+        parent_path = ''
+        for part in parts:
+            current_path = f"{parent_path}/{part}" if parent_path else part
+            if current_path not in self._folder_ids:
+                for item in self.folder_items(self._folder_ids[parent_path]):
+                    if item.type == 'folder':
+                        child_path = f"{parent_path}/{item.name}" if parent_path else item.name
+                        self._folder_ids.setdefault(child_path, item.id)
+            if current_path not in self._folder_ids:
+                logger.info(f"Folder '{part}' not found in the specified path.")
+                return None
+            parent_path = current_path
+        return self._folder_ids[parent_path]
+
+    def file_id(self, file_path):
+        """The Box ID of a file: recorded when it was listed, or looked up in its folder."""
+        if file_path in self._file_ids:
+            return self._file_ids[file_path]
+
+        folder_path, _, file_name = file_path.strip('/').rpartition('/')
+        folder_id = self.folder_id(folder_path)
+        if folder_id is None:
+            return None
+        for item in self.folder_items(folder_id):
+            if item.type == 'file' and item.name == file_name:
+                self._file_ids[file_path] = item.id
+                return item.id
+        return None
+
     def read_file(self, file_id):
         logger.info(f"Reading file with ID: {file_id}")
         file_content = self.client.file(file_id).content()
@@ -66,43 +107,12 @@ class BoxSource(FileBaseSource):
         if not self.client:
             self.connect()
 
-        download_folder = 'tempfile_downloads'
-        if not os.path.exists(download_folder):
-            os.makedirs(download_folder)
-
-        logger.info("Downloading files from Box...")
-        print("==========")
-        print(file_path)
+        logger.info(f"Downloading {file_path} from Box...")
 
-        local_file_path = os.path.join(download_folder, file_path.split('/')[-1])
-
-        path_parts = file_path.strip('/').split('/')
-        file_name = path_parts.pop()
-
-        # Start from the root folder
-        current_folder_id = '0'
-
-        # Traverse the path
-        for part in path_parts:
-            items = self.client.folders.get_folder_items(current_folder_id).entries
-            found = False
-            for item in items:
-                if item.type == 'folder' and item.name == part:
-                    current_folder_id = item.id
-                    found = True
-                    break
-            if not found:
-                logger.info(f"Folder '{part}' not found in the specified path.")
-                return
-
-        # Find the file in the final folder
-        items = self.client.folders.get_folder_items(current_folder_id).entries
-        file_id = None
-        for item in items:
-            if item.type == 'file' and item.name == file_name:
-                file_id = item.id
-                break
+        local_file_path = self.temp_path(file_path)
+        file_name = os.path.basename(file_path)
 
+        file_id = self.file_id(file_path)
         if file_id:
             file_content_stream: BufferedIOBase = self.client.downloads.download_file(
                 file_id=file_id
@@ -112,8 +122,10 @@ class BoxSource(FileBaseSource):
             logger.info(f"File '{file_name}' downloaded successfully.")
         else:
             logger.info(f"File '{file_name}' not found in the specified folder.")
+            return
 
         logger.info(f'File downloaded to {local_file_path}')
+        return local_file_path
 
     def delete_directory(self, path):
 
@@ -0,0 +1,81 @@
+import pandas as pd
+
+
+class ColumnBuffer:
+    """
+    Accumulates parsed files until a batch is emitted, then builds the
+    batch DataFrame in a single pass.
+
+    Column data (a dict of equal-length lists, such as document element
+    records) is appended to per-column lists, so no DataFrame is built per
+    file. DataFrames (tabular files) are kept as they are. Appends keep file
+    order, and nothing read earlier is copied again when more is appended.
+    A file read in chunks is appended chunk by chunk, and counted in
+    ``files`` once ``end_file`` is called.
+    """
+
+    def __init__(self):
+        self.files = 0
+        self.rows = 0
+        self._segments = []
+
+    def __len__(self):
+        return self.rows
+
+    def append(self, data):
+        """Append a DataFrame or a dict of column lists."""
+        if isinstance(data, pd.DataFrame):
+            self._segments.append(data)
+            self.rows += len(data)
+            return
+
+        length = len(next(iter(data.values()), []))
+        if not self._segments or not isinstance(self._segments[-1], _Columns):
+            self._segments.append(_Columns())
+        self._segments[-1].extend(data, length)
+        self.rows += length
+
+    def end_file(self):
+        """Count a file whose data has all been appended."""
+        self.files += 1
+
+    def materialize(self, end_batch=True):
+        """
+        Return everything appended as one DataFrame and empty the buffer.
+        With ``end_batch`` False the file count is kept, for a flush in the
+        middle of a batch.
+        """
+        frames = [segment.frame() if isinstance(segment, _Columns) else segment for segment in self._segments]
+        if end_batch:
+            self.files = 0
+        self.rows = 0
+        self._segments = []
+
+        if not frames:
+            return pd.DataFrame()
+        if len(frames) == 1:
+            return frames[0]
+        return pd.concat(frames, ignore_index=True)
+
+
+class _Columns:
+    """Column lists padded with None where a file lacked a column."""
+
+    def __init__(self):
+        self.columns = {}
+        self.length = 0
+
+    def extend(self, data, length):
+        for name, values in data.items():
+            column = self.columns.get(name)
+            if column is None:
+                column = self.columns[name] = [None] * self.length
+            column.extend(values)
+
+        self.length += length
+        for column in self.columns.values():
+            if len(column) < self.length:
+                column.extend([None] * (self.length - len(column)))
+
+    def frame(self):
+        return pd.DataFrame(self.columns)
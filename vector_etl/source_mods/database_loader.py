@@ -1,6 +1,17 @@
+import datetime
+import decimal
+import io
+import itertools
 import pandas as pd
 import logging
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from .base import BaseSource
+from ..pools import ConnectionPool
+from ..state import get_watermark_store
 import psycopg2
 import mysql.connector
 import snowflake.connector
@@ -9,16 +20,128 @@ from simple_salesforce import Salesforce
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+_DONE = object()
+_POLL_INTERVAL = 0.1
+
+_SOQL_FROM = re.compile(r'\bFROM\s+(\w+)', re.IGNORECASE)
+_SOQL_WHERE = re.compile(r'\bWHERE\b', re.IGNORECASE)
+_SOQL_TAIL = re.compile(r'\b(WITH|GROUP\s+BY|ORDER\s+BY|LIMIT|OFFSET|FOR\s+(VIEW|REFERENCE|UPDATE)|ALL\s+ROWS)\b',
+                        re.IGNORECASE)
+_ISO_DATE = re.compile(r'^\d{4}-\d{2}-\d{2}')
+
+
+def split_range(low, high, partitions):
+    """
+    Split ``[low, high]`` into ``partitions`` equal ranges and return the
+    boundaries. Works for numbers, decimals, dates and datetimes.
+    """
+    if isinstance(low, int) and isinstance(high, int):
+        bounds = [low + (high - low) * i // partitions for i in range(partitions + 1)]
+    elif isinstance(low, decimal.Decimal):
+        bounds = [low + (high - low) * decimal.Decimal(i) / partitions for i in range(partitions + 1)]
+    else:
+        bounds = [low + (high - low) * (i / partitions) for i in range(partitions + 1)]
+
+    bounds[-1] = high
+    return list(dict.fromkeys(bounds))
+
+
+def _top_level_match(pattern, query, start=0):
+    """First match of ``pattern`` outside parentheses, skipping relationship subqueries."""
+    for match in pattern.finditer(query, start):
+        prefix = query[:match.start()]
+        if prefix.count('(') == prefix.count(')'):
+            return match
+    return None
+
+
+def soql_object(query):
+    match = _top_level_match(_SOQL_FROM, query)
+    if match is None:
+        raise ValueError(f"Could not find the queried object in: {query}")
+    return match.group(1)
+
+
+def add_soql_condition(query, condition):
+    """AND ``condition`` into the top-level WHERE clause of a SOQL query."""
+    query = query.strip().rstrip(';')
+    from_match = _top_level_match(_SOQL_FROM, query)
+    start = from_match.end() if from_match else 0
+
+    tail = _top_level_match(_SOQL_TAIL, query, start)
+    head, rest = (query[:tail.start()].rstrip(), ' ' + query[tail.start():]) if tail else (query, '')
+
+    where = _top_level_match(_SOQL_WHERE, head, start)
+    if where:
+        head = f"{head[:where.end()]} ({head[where.end():].strip()}) AND {condition}"
+    else:
+        head = f"{head} WHERE {condition}"
+    return head + rest
+
+
+def soql_literal(value):
+    """Format a watermark value as a SOQL literal."""
+    if isinstance(value, str) and _ISO_DATE.match(value) and len(value) > 10:
+        value = pd.Timestamp(value)
+
+    if isinstance(value, datetime.datetime):
+        timestamp = pd.Timestamp(value)
+        timestamp = timestamp.tz_localize('UTC') if timestamp.tzinfo is None else timestamp.tz_convert('UTC')
+        # SOQL datetimes have whole seconds; rounding down re-reads at most one second of rows
+        return timestamp.strftime('%Y-%m-%dT%H:%M:%SZ')
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if isinstance(value, str):
+        escaped = value.replace('\\', '\\\\').replace("'", "\\'")
+        return f"'{escaped}'"
+    return str(value)
+
+
+def salesforce_records_frame(records):
+    """Flatten Salesforce REST records into a DataFrame, dropping the ``attributes`` metadata."""
+    df = pd.json_normalize(records)
+    metadata = [col for col in df.columns
+                if col == 'attributes' or col.startswith('attributes.') or '.attributes.' in col
+                or col.endswith('.attributes')]
+    return df.drop(columns=metadata)
+
+
+def reset_session(connection):
+    """Return a psycopg2 connection to the default isolation level before it goes back to the pool."""
+    connection.rollback()
+    connection.set_session(isolation_level='DEFAULT')
+
+
+def partition_conditions(column, bounds):
+    """
+    WHERE conditions and parameters covering every row exactly once. The
+    first and last ranges are open-ended so rows outside ``bounds`` are not
+    lost, and rows with a NULL partition value get a partition of their own.
+    """
+    inner = list(bounds[1:-1])
+    if not inner:
+        conditions = [(f"{column} IS NOT NULL", ())]
+    else:
+        conditions = [(f"{column} < %s", (inner[0],))]
+        conditions += [(f"{column} >= %s AND {column} < %s", (low, high)) for low, high in zip(inner, inner[1:])]
+        conditions += [(f"{column} >= %s", (inner[-1],))]
+
+    return conditions + [(f"{column} IS NULL", ())]
+
 
 class DatabaseSource(BaseSource):
     def __init__(self, config):
         self.config = config
         self.connection = None
         self.cursor = None
+        self.watermark = None
+        self._watermark_store = None
+        self._pool = None
+        self._pooled = False
 
-    def connect(self):
+    def create_connection(self):
         if self.config["db_type"] == 'postgres':
-            self.connection = psycopg2.connect(
+            return psycopg2.connect(
                 host=self.config["host"],
                 database=self.config["database_name"],
                 user=self.config["username"],
@@ -26,7 +149,7 @@ class DatabaseSource(BaseSource):
                 port=self.config["port"]
             )
         elif self.config["db_type"] == 'mysql':
-            self.connection = mysql.connector.connect(
+            return mysql.connector.connect(
                 host=self.config["host"],
                 database=self.config["database_name"],
                 user=self.config["username"],
@@ -34,7 +157,7 @@ class DatabaseSource(BaseSource):
                 port=self.config["port"]
             )
         elif self.config["db_type"] == 'snowflake':
-            self.connection = snowflake.connector.connect(
+            return snowflake.connector.connect(
                 account=self.config["account"],
                 database=self.config["database_name"].upper(),
                 user=self.config["username"],
@@ -43,55 +166,429 @@ class DatabaseSource(BaseSource):
                 schema=self.config["schema"].upper()
             )
         elif self.config["db_type"] == 'salesforce':
-            self.connection = Salesforce(
+            return Salesforce(
                 username=self.config["username"],
                 password=self.config["password"],
-                security_token=self.config["security_token"]
+                security_token=self.config["security_token"],
+                domain=self.config.get("domain")
             )
         else:
             raise ValueError("Invalid database type")
 
-        self.cursor = self.connection.cursor()
+    @property
+    def pool(self):
+        if self._pool is None:
+            # One connection for the coordinating query plus one per partition reader
+            readers = self.config.get("partition_workers", self.config.get("partitions", 4))
+            max_size = 1 + readers if self.fetch_mode == 'partitioned' else 1
+            self._pool = ConnectionPool.from_config(self.create_connection, self.config, max_size=max_size)
+        return self._pool
+
+    def connect(self):
+        # Salesforce is queried through its REST and Bulk APIs rather than a cursor
+        if self.config["db_type"] == 'salesforce':
+            self.connection = self.create_connection()
+        else:
+            self.connection = self.pool.acquire()
+            self._pooled = True
+            self.cursor = self.connection.cursor()
         logger.info(f"Connected to {self.config['db_type']} database")
 
+    def release_connection(self):
+        """Hand the connection back to the pool, so the next run reuses it."""
+        if self._pooled:
+            self.pool.release(self.connection)
+        else:
+            self.connection.close()
+        self.connection = None
+        self.cursor = None
+        self._pooled = False
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+
     def fetch_data(self):
         if not self.connection:
             self.connect()
 
-        query = self.config.get("query", "")
+        query, params = self.source_query()
         batch_size = self.config.get("batch_size", 1000)
 
-        if self.config["db_type"] in ['postgres', 'mysql']:
-            batched_query = f"{query} LIMIT {batch_size} OFFSET %s"
-        elif self.config["db_type"] == 'snowflake':
-            batched_query = f"{query} LIMIT {batch_size} OFFSET %s"
-        elif self.config["db_type"] == 'salesforce':
-            # Salesforce uses OFFSET in the query itself
-            batched_query = f"{query} LIMIT {batch_size} OFFSET %s"
+        try:
+            if self.config["db_type"] == 'salesforce':
+                batches = self._fetch_salesforce(query, batch_size)
+            elif self.fetch_mode == 'keyset':
+                batches = self._fetch_keyset(query, params, batch_size)
+            elif self.fetch_mode == 'stream':
+                batches = self._fetch_stream(query, params, batch_size)
+            elif self.fetch_mode == 'arrow':
+                batches = self._fetch_arrow(query, params)
+            elif self.fetch_mode == 'partitioned':
+                batches = self._fetch_partitioned(query, params, batch_size)
+            elif self.fetch_mode == 'offset':
+                batches = self._fetch_offset(query, params, batch_size)
+            else:
+                raise ValueError(f"Unsupported fetch_mode: {self.fetch_mode}")
+
+            for df_batch in batches:
+                logger.info(f"========== Retrieved batch of {len(df_batch)} rows ===========")
+                yield df_batch
+        finally:
+            # Salesforce connections are HTTP sessions with nothing to close
+            if self.config["db_type"] != 'salesforce':
+                self.cursor.close()
+                self.release_connection()
+
+    @property
+    def fetch_mode(self):
+        if self.config["db_type"] == 'salesforce':
+            return self.config.get("fetch_mode", "query")
+        return self.config.get("fetch_mode", "keyset" if self.config.get("keyset_column") else "offset")
+
+    @property
+    def keyset_columns(self):
+        key_columns = self.config.get("keyset_column") or []
+        return [key_columns] if isinstance(key_columns, str) else list(key_columns)
+
+    def source_query(self):
+        """
+        The configured query and its parameters, restricted to rows past the
+        last committed watermark when incremental loading is configured.
+        """
+        query = self.config.get("query", "")
+        column = self.config.get("watermark_column")
+        if not column:
+            return query, ()
+
+        self.watermark = self.get_db_watermark()
+        if self.watermark is None:
+            logger.info(f"No watermark stored for {column}; extracting all rows")
+            return query, ()
+
+        logger.info(f"Extracting rows with {column} > {self.watermark}")
+        if self.config["db_type"] == 'salesforce':
+            return add_soql_condition(query, f"{column} > {soql_literal(self.watermark)}"), ()
+
+        query = query.strip().rstrip(';')
+        return f"SELECT * FROM ({query}) AS vetl_watermark WHERE {column} > %s", (self.watermark,)
+
+    def _fetch_offset(self, query, params, batch_size):
+        batched_query = f"{query} LIMIT {batch_size} OFFSET %s"
 
         offset = 0
         while True:
-            self.cursor.execute(batched_query, (offset,))
+            self.cursor.execute(batched_query, params + (offset,))
             batch = self.cursor.fetchall()
 
             if not batch:
                 break
 
             columns = [desc[0] for desc in self.cursor.description]
-            df_batch = pd.DataFrame(batch, columns=columns)
-            logger.info(f"========== Retrieved batch of {len(df_batch)} rows ===========")
-
-            yield df_batch
+            yield pd.DataFrame(batch, columns=columns)
 
             offset += batch_size
 
-        self.cursor.close()
-        self.connection.close()
+    def _fetch_stream(self, query, params, batch_size, connection=None):
+        """
+        Run the query once on a server-side cursor and read it ``batch_size``
+        rows at a time, so only one batch is held in client memory.
+        """
+        connection = connection or self.connection
+        if self.config["db_type"] == 'postgres':
+            # A named cursor makes psycopg2 declare a server-side cursor
+            cursor = connection.cursor(name='vector_etl_stream')
+            cursor.itersize = batch_size
+        elif self.config["db_type"] == 'mysql':
+            cursor = connection.cursor(buffered=False)
+        elif self.config["db_type"] == 'snowflake':
+            # Snowflake downloads the result in chunks as it is read
+            cursor = connection.cursor()
+        else:
+            raise ValueError(f"Streaming is not supported for {self.config['db_type']}")
+
+        try:
+            cursor.execute(query, params or None)
+            columns = None
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+
+                if columns is None:
+                    columns = [desc[0] for desc in cursor.description]
+                yield pd.DataFrame.from_records(batch, columns=columns)
+        finally:
+            cursor.close()
+
+    def _fetch_salesforce(self, query, batch_size):
+        """
+        Run a SOQL query, yielding DataFrames as result pages arrive. The
+        ``query`` mode follows the REST API's queryMore cursor; the ``bulk``
+        mode runs a Bulk API 2.0 query job and streams its result pages by
+        locator, which suits large objects.
+        """
+        include_deleted = self.config.get("include_deleted", False)
+
+        if self.fetch_mode == 'query':
+            records = self.connection.query_all_iter(query, include_deleted=include_deleted)
+            while True:
+                batch = list(itertools.islice(records, batch_size))
+                if not batch:
+                    break
+                yield salesforce_records_frame(batch)
+
+        elif self.fetch_mode == 'bulk':
+            object_name = self.config.get("salesforce_object") or soql_object(query)
+            job = getattr(self.connection.bulk2, object_name)
+            run = job.query_all if include_deleted else job.query
+
+            for page in run(query, max_records=batch_size, wait=self.config.get("bulk_poll_interval", 5)):
+                df_batch = pd.read_csv(io.StringIO(page))
+                if not df_batch.empty:
+                    yield df_batch
+
+        else:
+            raise ValueError(f"Unsupported fetch_mode for salesforce: {self.fetch_mode}")
+
+    def _fetch_arrow(self, query, params, connection=None):
+        """
+        Run the query once on Snowflake and yield the result chunks as
+        DataFrames converted from Arrow, skipping Python row tuples. Chunks
+        are downloaded in parallel by the connector, and their size is set
+        by Snowflake rather than by ``batch_size``.
+        """
+        if self.config["db_type"] != 'snowflake':
+            raise ValueError(f"Arrow batches are not supported for {self.config['db_type']}")
+
+        cursor = (connection or self.connection).cursor()
+        try:
+            cursor.execute(query, params or None)
+            for df_batch in cursor.fetch_pandas_batches():
+                if not df_batch.empty:
+                    yield df_batch
+        finally:
+            cursor.close()
+
+    def _fetch_partitioned(self, query, params, batch_size):
+        """
+        Split the query into ranges of ``partition_column`` and read the
+        ranges concurrently, each on its own connection. Batches are yielded
+        as soon as any reader produces them.
+        """
+        if self.config["db_type"] not in ['postgres', 'mysql', 'snowflake']:
+            raise ValueError(f"Partitioned reads are not supported for {self.config['db_type']}")
+
+        column = self.config.get("partition_column")
+        if not column:
+            raise ValueError("fetch_mode 'partitioned' requires partition_column")
+        partitions = self.config.get("partitions", 4)
+        workers = self.config.get("partition_workers", partitions)
+        # Seconds to wait for the next batch from any partition before giving up
+        timeout = self.config.get("partition_timeout", 900)
+
+        snapshot = None
+        if self.config.get("consistent_snapshot"):
+            if self.config["db_type"] != 'postgres':
+                raise ValueError("consistent_snapshot is only supported for postgres")
+            # The exporting transaction stays open until every reader is done
+            self.connection.set_session(isolation_level='REPEATABLE READ')
+            self.cursor.execute("SELECT pg_export_snapshot()")
+            snapshot = self.cursor.fetchone()[0]
+
+        query = query.strip().rstrip(';')
+        bounds = self.config.get("partition_bounds")
+        if not bounds or len(bounds) == 2:
+            low, high = bounds or self._column_range(query, params, column)
+            bounds = split_range(low, high, partitions) if low is not None else []
+
+        readers = [(f"SELECT * FROM ({query}) AS vetl_partition WHERE {condition}", params + condition_params)
+                   for condition, condition_params in partition_conditions(column, bounds)]
+        logger.info(f"Reading {len(readers)} partitions of {column} with {workers} connections")
+
+        results = queue.Queue(workers * 2)
+        stop = threading.Event()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    results.put(item, timeout=_POLL_INTERVAL)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def read(partition_query, partition_params):
+            try:
+                with self.pool.connection() as connection:
+                    try:
+                        if snapshot:
+                            connection.set_session(isolation_level='REPEATABLE READ')
+                            connection.cursor().execute("SET TRANSACTION SNAPSHOT %s", (snapshot,))
+                        if self.config["db_type"] == 'snowflake':
+                            partition_batches = self._fetch_arrow(partition_query, partition_params, connection)
+                        else:
+                            partition_batches = self._fetch_stream(partition_query, partition_params, batch_size,
+                                                                   connection)
+                        for df_batch in partition_batches:
+                            if not put(df_batch):
+                                return
+                    finally:
+                        if snapshot:
+                            reset_session(connection)
+            except Exception as e:
+                put(e)
+                return
+            put(_DONE)
+
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='vector-etl-partition')
+        futures = []
+        stalled = False
+        try:
+            for partition_query, partition_params in readers:
+                futures.append(executor.submit(read, partition_query, partition_params))
+
+            remaining = len(readers)
+            last_result = time.monotonic()
+            while remaining:
+                try:
+                    item = results.get(timeout=_POLL_INTERVAL)
+                except queue.Empty:
+                    # Readers put their last item before they finish, so nothing more can arrive
+                    if all(future.done() for future in futures) and results.empty():
+                        raise RuntimeError(f"{remaining} partition readers stopped without finishing")
+                    if timeout is not None and time.monotonic() - last_result > timeout:
+                        stalled = True
+                        raise TimeoutError(f"No rows from the partition readers for {timeout} seconds")
+                    continue
+                last_result = time.monotonic()
+                if item is _DONE:
+                    remaining -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield item
+        finally:
+            stop.set()
+            # Partitions not started yet are dropped
+            for future in futures:
+                future.cancel()
+            # A stalled reader may never return, so it is not waited for
+            executor.shutdown(wait=not stalled)
+            if snapshot:
+                reset_session(self.connection)
+
+    def _column_range(self, query, params, column):
+        self.cursor.execute(f"SELECT MIN({column}), MAX({column}) FROM ({query}) AS vetl_bounds", params or None)
+        return self.cursor.fetchone()
+
+    def _fetch_keyset(self, query, params, batch_size):
+        """
+        Page through the query ordered by ``keyset_column``, starting each
+        page after the last key seen, so every page costs the same no matter
+        how far into the result it is.
+        """
+        if self.config["db_type"] not in ['postgres', 'mysql', 'snowflake']:
+            raise ValueError(f"Keyset pagination is not supported for {self.config['db_type']}")
+
+        key_columns = self.keyset_columns
+        if not key_columns:
+            raise ValueError("fetch_mode 'keyset' requires keyset_column")
+
+        last_key = None
+        key_positions = None
+        while True:
+            keyset_query, keyset_params = self.keyset_query(query, key_columns, batch_size, last_key)
+            self.cursor.execute(keyset_query, (params + keyset_params) or None)
+            batch = self.cursor.fetchall()
+
+            if not batch:
+                break
+
+            columns = [desc[0] for desc in self.cursor.description]
+            if key_positions is None:
+                # Snowflake reports unquoted identifiers in upper case
+                lowered = [column.lower() for column in columns]
+                key_positions = [lowered.index(key.lower()) for key in key_columns]
+
+            yield pd.DataFrame(batch, columns=columns)
+
+            if len(batch) < batch_size:
+                break
+            last_key = [batch[-1][position] for position in key_positions]
+
+    @staticmethod
+    def keyset_query(query, key_columns, batch_size, last_key=None):
+        """
+        Wrap ``query`` to return the ``batch_size`` rows that follow
+        ``last_key`` in ``key_columns`` order. Returns the SQL and its
+        parameters.
+        """
+        query = query.strip().rstrip(';')
+        keyset_query = f"SELECT * FROM ({query}) AS vetl_keyset"
+        params = []
+
+        if last_key is not None:
+            # (a, b) > (x, y) spelled out, since not every database supports row comparisons
+            clauses = []
+            for i, column in enumerate(key_columns):
+                conditions = [f"{key} = %s" for key in key_columns[:i]] + [f"{column} > %s"]
+                clauses.append(f"({' AND '.join(conditions)})")
+                params.extend(last_key[:i + 1])
+            keyset_query += f" WHERE {' OR '.join(clauses)}"
+
+        keyset_query += f" ORDER BY {', '.join(key_columns)} LIMIT {batch_size}"
+        return keyset_query, tuple(params)
+
+    @property
+    def watermark_store(self):
+        if self._watermark_store is None:
+            self._watermark_store = get_watermark_store(self.config.get("watermark_store"))
+        return self._watermark_store
+
+    def watermark_key(self):
+        """Name under which this flow's watermark is stored."""
+        if self.config.get("flow_name"):
+            return self.config["flow_name"]
+        keys = ("db_type", "host", "database_name", "query", "watermark_column")
+        return ':'.join(str(self.config[key]) for key in keys if self.config.get(key))
+
+    @property
+    def watermark_ordered(self):
+        """True when batches arrive in watermark order, so the watermark can advance batch by batch."""
+        column = self.config.get("watermark_column")
+        key_columns = self.keyset_columns
+        return (self.fetch_mode == 'keyset' and bool(column) and bool(key_columns)
+                and key_columns[0].lower() == column.lower())
+
+    def batch_watermark(self, df):
+        """
+        Return ``(checkpoint, high)`` for a fetched batch, or None if the
+        source is not incremental. ``high`` is the largest watermark value in
+        the batch. When batches arrive in watermark order, rows still to come
+        may share ``high``, so ``checkpoint`` is the largest value below it:
+        every row up to ``checkpoint`` is in this batch or an earlier one.
+        """
+        column = self.config.get("watermark_column")
+        if not column:
+            return None
+
+        # Snowflake reports unquoted identifiers in upper case
+        matches = [col for col in df.columns if str(col).lower() == column.lower()]
+        if not matches:
+            raise ValueError(f"Watermark column {column} is not in the query result")
+
+        values = df[matches[0]].dropna()
+        if values.empty:
+            return None
+
+        high = values.max()
+        below = values[values < high]
+        return (below.max() if not below.empty else None), high
 
     def get_db_watermark(self):
-        # Implement logic to get the latest watermark
-        pass
+        return self.watermark_store.get(self.watermark_key())
 
     def update_db_watermark(self, new_watermark):
-        # Implement logic to update the watermark
-        pass
+        self.watermark_store.set(self.watermark_key(), new_watermark)
+        logger.info(f"Watermark for {self.config['watermark_column']} advanced to {new_watermark}")
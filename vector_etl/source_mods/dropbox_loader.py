@@ -32,6 +32,7 @@ class DropboxSource(FileBaseSource):
                     print(entry)
                     if entry.path_lower.endswith(self.file_type):
                         files.append(entry.path_lower)
+                        self.file_versions[entry.path_lower] = entry.content_hash or entry.rev
             if response.has_more:
                 response = self.dbx.files_list_folder_continue(response.cursor)
             else:
@@ -46,15 +47,10 @@ class DropboxSource(FileBaseSource):
         if not self.dbx:
             self.connect()
 
-        download_folder = 'tempfile_downloads'
-        if not os.path.exists(download_folder):
-            os.makedirs(download_folder)
-
         logger.info("Downloading files from Dropbox...")
-        local_path = os.path.join(download_folder, os.path.basename(file_path))
-        with open(local_path, "wb") as f:
-            metadata, res = self.dbx.files_download(path=file_path)
-            f.write(res.content)
+        # The SDK has already read the whole response into memory
+        metadata, res = self.dbx.files_download(path=file_path)
+        return BytesIO(res.content)
 
     def delete_directory(self, path):
 
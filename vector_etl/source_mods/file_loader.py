@@ -1,24 +1,129 @@
 import logging
 import pandas as pd
 from abc import abstractmethod
+import hashlib
 import os
+import tempfile
+import threading
+from collections import deque
+from contextlib import closing
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from io import BytesIO
+from types import SimpleNamespace
+from pypdf import PdfReader, PdfWriter
+from pypdf.errors import PyPdfError
 from unstructured.partition.auto import partition
+from unstructured.partition.common.metadata import set_element_hierarchy
 from unstructured_client import UnstructuredClient
 from unstructured_client.models import shared
 from unstructured_client.models.errors import SDKError
 import nltk
 nltk.download('averaged_perceptron_tagger')
 from .base import BaseSource
+from .buffer import ColumnBuffer
+from .readers import ARROW_FILE_FORMATS, read_arrow_chunks, read_json_chunks
+from ..chunking import split_dataframe_column
+from ..pools import ProcessPool
+from ..state import FileManifest
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Formats read in chunks of ``read_chunk_size`` rows rather than whole
+STREAMED_FILE_TYPES = ('csv', 'json', 'jsonl', 'ndjson') + tuple(ARROW_FILE_FORMATS)
+
+
+def partition_records(source, file_name=None, starting_page_number=1):
+    """
+    Partition a document into compact element records holding the element
+    id, text, category and metadata. Runs in parser worker processes, so
+    ``source`` is a path or the raw bytes of the file.
+    """
+    if isinstance(source, str):
+        elements = partition(source, mode="elements", strategy="fast", starting_page_number=starting_page_number)
+    else:
+        if isinstance(source, bytes):
+            source = BytesIO(source)
+        elements = partition(file=source, metadata_filename=file_name, mode="elements", strategy="fast",
+                             starting_page_number=starting_page_number)
+
+    return [{'id': el.id, 'text': el.text, 'category': el.category, 'metadata': el.metadata.to_dict()}
+            for el in elements]
+
+
+def pdf_page_ranges(source, pages_per_range):
+    """
+    Split a PDF (a path or a binary file object) into standalone PDFs of at
+    most ``pages_per_range`` pages. Returns ``(starting_page_number, bytes)``
+    pairs, or None if the document has no more pages than one range.
+    """
+    reader = PdfReader(source)
+    page_count = len(reader.pages)
+    if page_count <= pages_per_range:
+        return None
+
+    ranges = []
+    for start in range(0, page_count, pages_per_range):
+        writer = PdfWriter()
+        for page in reader.pages[start:start + pages_per_range]:
+            writer.add_page(page)
+        buffer = BytesIO()
+        writer.write(buffer)
+        ranges.append((start + 1, buffer.getvalue()))
+    return ranges
+
+
+def link_parents(elements, id_key='id', category_key='category'):
+    """
+    Recompute ``parent_id`` across elements partitioned in separate page
+    ranges, so sections that start in one range and continue into the next
+    keep their parent, as if the document had been partitioned whole.
+    """
+    nodes = [SimpleNamespace(id=element[id_key], category=element[category_key],
+                             metadata=SimpleNamespace(parent_id=None,
+                                                      category_depth=element['metadata'].get('category_depth')))
+             for element in elements]
+    set_element_hierarchy(nodes)
+
+    for element, node in zip(elements, nodes):
+        if node.metadata.parent_id is None:
+            element['metadata'].pop('parent_id', None)
+        else:
+            element['metadata']['parent_id'] = node.metadata.parent_id
+    return elements
+
+
+def elements_columns(records, file_extension):
+    """Column lists of the parsed-document table, built from element records."""
+    data = {
+        'id': [record['id'] for record in records],
+        'parent_id': [record['metadata'].get('parent_id') for record in records],
+        'text': [record['text'] for record in records],
+        'category': [record['category'] for record in records],
+        'file_type': [record['metadata'].get('filetype') for record in records],
+        'file_name': [record['metadata'].get('filename') for record in records]
+    }
+
+    if file_extension == "pdf":
+        data['page_number'] = [record['metadata'].get('page_number') for record in records]
+        data['coordinates'] = [record['metadata'].get('coordinates') for record in records]
+
+    return data
+
 
 class FileBaseSource(BaseSource):
     def __init__(self, config):
         self.config = config
         self.chunk_size = config.get('chunk_size', 1000)
         self.chunk_overlap = config.get('chunk_overlap', 0)
+        self._temp_dir = None
+        self._temp_dir_lock = threading.Lock()
+        self._parser_pool = None
+        self._manifest = None
+        # Columns to decode from Parquet, Arrow IPC and Feather files (None reads all)
+        self.columns = config.get('columns')
+        # Version of each listed file, filled in by list_files where the listing reports one
+        self.file_versions = {}
 
     @abstractmethod
     def list_files(self):
@@ -32,7 +137,10 @@ class FileBaseSource(BaseSource):
 
     @abstractmethod
     def download_file(self, file_path):
-        """Read a single file and return its content."""
+        """
+        Fetch a single file. Returns a local path to parse, or a binary file
+        object holding the file content.
+        """
         pass
 
     @abstractmethod
@@ -40,48 +148,131 @@ class FileBaseSource(BaseSource):
         """Delete temporary directory."""
         pass
 
-    def parse_text_files(self, file_path, file_extension):
-        elements = partition(file_path, mode="elements", strategy="fast")
+    def project(self, columns):
+        if self.config.get('columns') is None:
+            self.columns = list(dict.fromkeys(columns))
+
+    def file_version(self, file_path):
+        """
+        Identifier of the current content of ``file_path``, such as an ETag
+        or revision, or None if unknown. Changes whenever the file does.
+        """
+        return self.file_versions.get(file_path)
+
+    @property
+    def manifest(self):
+        if self._manifest is None:
+            self._manifest = FileManifest.from_config(self.config.get('skip_unchanged_files'))
+        return self._manifest
+
+    def manifest_key(self):
+        """Scope of this flow's entries in the file manifest."""
+        if self.config.get('flow_name'):
+            return self.config['flow_name']
+        keys = ('source_data_type', 'bucket_name', 'prefix', 'folder_path', 'file_path', 'file_type')
+        return ':'.join(str(self.config[key]) for key in keys if self.config.get(key))
+
+    def changed_files(self, files):
+        """Drop the files whose version matches the manifest. Returns ``(files, versions)``."""
+        if self.manifest is None:
+            return files, {}
+
+        versions = {file_path: self.file_version(file_path) for file_path in files}
+        changed = self.manifest.changed(self.manifest_key(), versions)
+        logger.info(f"{len(files) - len(changed)} of {len(files)} files are unchanged since the last run")
+        return changed, versions
+
+    def commit_files(self, versions):
+        """Record ``versions`` (path -> version) of files that are now in the target."""
+        self.manifest.record(self.manifest_key(), versions)
+
+    def close(self):
+        if self._manifest is not None:
+            self._manifest.close()
+            self._manifest = None
+
+    @property
+    def temp_dir(self):
+        """Scratch directory for this run's downloads, unique to the run."""
+        with self._temp_dir_lock:
+            if self._temp_dir is None:
+                self._temp_dir = os.path.abspath(tempfile.mkdtemp(prefix='vector_etl_',
+                                                                  dir=self.config.get('temp_dir')))
+        return self._temp_dir
+
+    def temp_path(self, file_path):
+        """
+        Where to download ``file_path`` to. Each source path gets its own
+        subdirectory, so same-named files from different folders never
+        collide, while the file name itself is kept for the parsers.
+        """
+        directory = os.path.join(self.temp_dir, hashlib.sha1(file_path.encode('utf-8')).hexdigest()[:16])
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, os.path.basename(file_path))
+
+    @property
+    def parser_pool(self):
+        """
+        Worker processes for document partitioning when ``parse_workers`` is
+        above 1, recycled after ``parse_worker_max_files`` files each.
+        """
+        workers = self.config.get('parse_workers', 1)
+        if workers <= 1:
+            return None
+
+        with self._temp_dir_lock:
+            if self._parser_pool is None:
+                self._parser_pool = ProcessPool(workers, self.config.get('parse_worker_max_files', 100))
+        return self._parser_pool
+
+    def pdf_ranges(self, source, file_name):
+        """
+        Page ranges of a PDF longer than ``pdf_split_pages`` pages, to be
+        partitioned concurrently, or None to partition it whole.
+        """
+        pages_per_range = self.config.get('pdf_split_pages')
+        if not pages_per_range:
+            return None
 
-        ids = []
-        document = []
-        category = []
-        file_type = []
-        file_name = []
-        parent_id = []
-
-        coordinates = [] if file_extension == "pdf" else None
-        page_number = [] if file_extension == "pdf" else None
-
-        for el in elements:
-            ids.append(el.id)
-            document.append(el.text)
-            category.append(el.category)
-            file_type.append(el.metadata.to_dict()["filetype"])
-            file_name.append(el.metadata.to_dict()["filename"])
-            parent_id.append(el.metadata.to_dict()["parent_id"] if 'parent_id' in el.metadata.to_dict() else None)
-
-            if file_extension == "pdf":# and el.metadata.to_dict()["filetype"].lower() == 'pdf':
-                coordinates.append(el.metadata.to_dict()["coordinates"])
-                page_number.append(el.metadata.to_dict()["page_number"])
-
-        data = {
-            'id': ids,
-            'parent_id': parent_id,
-            'text': document,
-            'category': category,
-            'file_type': file_type,
-            'file_name': file_name
-        }
-
-        if file_extension == "pdf":
-            data['page_number'] = page_number
-            data['coordinates'] = coordinates
+        try:
+            ranges = pdf_page_ranges(source, pages_per_range)
+        except PyPdfError as e:
+            logger.warning(f"Could not split {file_name} into page ranges ({str(e)}); partitioning it whole")
+            ranges = None
+        finally:
+            if not isinstance(source, str):
+                source.seek(0)
+
+        if ranges:
+            logger.info(f"Partitioning {file_name} in {len(ranges)} page ranges")
+        return ranges
+
+    def parse_text_files(self, source, file_extension, file_name=None):
+        return pd.DataFrame(self.parse_text_columns(source, file_extension, file_name))
+
+    def parse_text_columns(self, source, file_extension, file_name=None):
+        """Partition a document into a dict of column lists, one entry per element."""
+        pool = self.parser_pool
+        ranges = self.pdf_ranges(source, file_name) if file_extension == "pdf" else None
+
+        if ranges:
+            if pool is None:
+                parts = [partition_records(content, file_name, start) for start, content in ranges]
+            else:
+                futures = [pool.submit(partition_records, content, file_name, start) for start, content in ranges]
+                parts = [future.result() for future in futures]
+            records = link_parents([record for part in parts for record in part])
+        elif pool is None:
+            records = partition_records(source, file_name)
+        else:
+            # Workers open paths themselves; in-memory downloads are sent as bytes
+            payload = source if isinstance(source, str) else source.read()
+            records = pool.submit(partition_records, payload, file_name).result()
 
-        return pd.DataFrame(data)
+        return elements_columns(records, file_extension)
 
 
-    def parse_text_files_unstructured(self, file_path, file_extension):
+    def parse_text_files_unstructured(self, source, file_extension, file_name=None):
         logger.info("Using Unstructured API...")
 
         client = UnstructuredClient(
@@ -89,19 +280,39 @@ class FileBaseSource(BaseSource):
             server_url=self.config.get('unstructured_url', '')
         )
 
-        file = open(file_path, "rb")
-        req = shared.PartitionParameters(
-            files=shared.Files(
-                content=file.read(),
-                file_name=file_path,
-            ),
-            strategy="auto",
-            coordinates=True,
-        )
+        file_name = file_name or os.path.basename(source)
+        ranges = self.pdf_ranges(source, file_name) if file_extension == "pdf" else None
+
+        if not ranges:
+            if isinstance(source, str):
+                with open(source, "rb") as file:
+                    content = file.read()
+            else:
+                content = source.read()
+            ranges = [(1, content)]
+
+        def partition_range(page_range):
+            starting_page_number, range_content = page_range
+            req = shared.PartitionParameters(
+                files=shared.Files(
+                    content=range_content,
+                    file_name=file_name,
+                ),
+                strategy="auto",
+                coordinates=True,
+                starting_page_number=starting_page_number,
+            )
+            return client.general.partition(req).elements
 
         try:
-            res = client.general.partition(req)
-            elements = res.elements
+            if len(ranges) == 1:
+                elements = partition_range(ranges[0])
+            else:
+                concurrency = min(self.config.get('parse_workers', 1), len(ranges))
+                with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='vector-etl-partition') as executor:
+                    parts = list(executor.map(partition_range, ranges))
+                elements = link_parents([el for part in parts for el in part], id_key='element_id',
+                                        category_key='type')
             ids = []
             document = []
             type = []
@@ -143,28 +354,137 @@ class FileBaseSource(BaseSource):
 
 
     def process_file(self, file_path):
+        return self.parse_file(file_path, self.download_file(file_path))
+
+    def parse_file(self, file_path, content):
+        """
+        Parse ``content`` (a local path or a binary file object, as returned
+        by ``download_file``), then release it. Returns a DataFrame, a dict
+        of column lists for documents partitioned locally, or for CSV, JSON
+        and JSON Lines files and for Parquet, Arrow IPC and Feather files an
+        iterator of DataFrames (see ``read_chunks``).
+        """
+        if content is None:
+            raise FileNotFoundError(f"Could not download {file_path}")
+
         file_type = file_path.split('.')[-1].lower()
-        content = self.download_file(file_path)
-
-        local_file_path = f"tempfile_downloads/{file_path.split('/')[-1]}"
-
-        if file_type == 'csv':
-            df = pd.read_csv(local_file_path)
-        elif file_type in ['xlsx', 'xls']:
-            df = pd.read_excel(local_file_path)
-        elif file_type == 'json':
-            df = pd.read_json(local_file_path)
-        elif file_type in ['txt', 'pdf', 'doc', 'docx']:
-            if self.config.get('use_unstructured'):
-                df = self.parse_text_files_unstructured(local_file_path, file_type)
+        file_name = os.path.basename(file_path)
+
+        if file_type in STREAMED_FILE_TYPES:
+            return self.read_chunks(content, file_type)
+
+        try:
+            if file_type in ['xlsx', 'xls']:
+                data = pd.read_excel(content)
+            elif file_type in ['txt', 'pdf', 'doc', 'docx']:
+                if self.config.get('use_unstructured'):
+                    data = self.parse_text_files_unstructured(content, file_type, file_name)
+                else:
+                    data = self.parse_text_columns(content, file_type, file_name)
             else:
-                df = self.parse_text_files(local_file_path, file_type)
-        else:
-            raise ValueError(f"Unsupported file type: {file_type}")
+                raise ValueError(f"Unsupported file type: {file_type}")
+        finally:
+            self.release_download(content)
+
+        return data
+
+    def read_chunks(self, content, file_type):
+        """
+        Yield DataFrames of at most ``read_chunk_size`` rows from a CSV, JSON,
+        JSON Lines, Parquet, Arrow IPC or Feather file, so memory stays
+        bounded however large the file is. The download is released once the
+        file has been read.
+        """
+        chunk_size = self.config.get('read_chunk_size', 100000)
+
+        try:
+            if file_type == 'csv':
+                # Files on disk are memory-mapped rather than read through a buffer
+                reader = pd.read_csv(content, chunksize=chunk_size, memory_map=isinstance(content, str))
+            elif file_type == 'json':
+                reader = read_json_chunks(content, chunk_size)
+            elif file_type in ARROW_FILE_FORMATS:
+                reader = read_arrow_chunks(content, file_type, chunk_size, columns=self.columns,
+                                           filters=self.config.get('filters'))
+            else:
+                reader = pd.read_json(content, lines=True, chunksize=chunk_size)
+
+            with closing(reader):
+                yield from reader
+        finally:
+            self.release_download(content)
+
+    def release_download(self, content):
+        """Close an in-memory download, or delete one from this run's scratch directory."""
+        if not isinstance(content, str):
+            content.close()
+        elif self._temp_dir is not None and os.path.abspath(content).startswith(self._temp_dir + os.sep):
+            os.remove(content)
+
+    def read_files(self, files):
+        """
+        Yield ``(file_path, data)`` for every file, with ``data`` as returned
+        by ``parse_file``. Up to
+        ``download_concurrency`` files are downloaded and parsed on a thread
+        pool at once, or ``parse_workers`` if that is higher, so documents
+        are partitioned in parallel by the parser worker processes. Files are
+        yielded as they finish, or in listing order when
+        ``preserve_file_order`` is set.
+        """
+        concurrency = max(self.config.get('download_concurrency', 4), self.config.get('parse_workers', 1))
+        preserve_order = self.config.get('preserve_file_order', False)
+
+        if concurrency <= 1:
+            for file_path in files:
+                yield file_path, self.process_file(file_path)
+            return
+
+        remaining = iter(files)
+        pending = deque()
+        file_paths = {}
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='vector-etl-read')
+
+        def submit_next():
+            for file_path in remaining:
+                future = executor.submit(self.process_file, file_path)
+                file_paths[future] = file_path
+                pending.append(future)
+                return
+
+        try:
+            for _ in range(concurrency):
+                submit_next()
 
-        return df
+            while pending:
+                if preserve_order:
+                    future = pending.popleft()
+                else:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    future = next(f for f in pending if f in done)
+                    pending.remove(future)
+
+                data = future.result()
+                submit_next()
+                yield file_paths.pop(future), data
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
 
     def fetch_data(self):
+        """
+        Yield the parsed and chunked file contents in bounded batches.
+
+        A batch is emitted once ``file_batch_size`` files have been read or
+        ``batch_size`` rows have accumulated, whichever comes first. Batches
+        are further sliced so that none exceeds ``batch_size`` rows. Files
+        read in chunks are emitted part by part in full slices of
+        ``batch_size`` (or without it ``read_chunk_size``) rows, and the
+        remaining rows carry over to the next batch. With
+        ``skip_unchanged_files``, only new and changed files are read, and
+        the last slice of each batch lists the versions of the files it
+        completes in ``attrs['files']``, to be committed once written.
+        """
         logger.info("Fetching data from files...")
         files = self.list_files()
 
@@ -172,25 +492,91 @@ class FileBaseSource(BaseSource):
             logger.info("No files to process. Exiting...")
             raise ValueError("No files found to process")
 
-        else:
-            df = pd.DataFrame()
-            new_files = []
-
-            for file_path in files:
-                new_files.append(file_path)
-                temp_df = self.process_file(file_path)
-
-                if df.empty:
-                    df = temp_df
-                else:
-                    df = pd.concat([df, temp_df], ignore_index=True)
+        files, versions = self.changed_files(files)
+        if not files:
+            logger.info("No new or changed files to process.")
+            return
 
-            if not df.empty:
-                df = self.split_dataframe_column(df, self.chunk_size, self.chunk_overlap)
-
-            delete_temp_dir = self.delete_directory('tempfile_downloads')
+        file_batch_size = self.config.get('file_batch_size', 100)
+        row_batch_size = self.config.get('batch_size')
+        row_limit = row_batch_size or self.config.get('read_chunk_size', 100000)
 
+        buffer = ColumnBuffer()
+        batch_files = {}
+        # Chunked rows left over from a flush in the middle of a file
+        carried = None
+        try:
+            for file_path, data in self.read_files(files):
+                chunks = [data] if isinstance(data, (pd.DataFrame, dict)) else data
+                for chunk in chunks:
+                    buffer.append(chunk)
+                    if len(buffer) + (0 if carried is None else len(carried)) >= row_limit:
+                        # Only full slices leave mid-file; the rest waits for more rows
+                        df = self._chunked_rows(buffer, carried, end_batch=False)
+                        full = len(df) - len(df) % row_limit
+                        for start in range(0, full, row_limit):
+                            yield df.iloc[start:start + row_limit].reset_index(drop=True)
+                        carried = df.iloc[full:]
+
+                buffer.end_file()
+                if versions.get(file_path) is not None:
+                    batch_files[file_path] = versions[file_path]
+
+                if buffer.files >= file_batch_size:
+                    yield from self._emit_batches(buffer, row_batch_size, batch_files, carried)
+                    batch_files = {}
+                    carried = None
+
+            if buffer.files:
+                yield from self._emit_batches(buffer, row_batch_size, batch_files, carried)
+        finally:
+            self._close_parser_pool()
+            self._clear_downloads()
+
+    def _chunked_rows(self, buffer, carried=None, end_batch=True):
+        """The buffer's rows split into chunks, after any rows ``carried`` over already chunked."""
+        df = buffer.materialize(end_batch)
+        if not df.empty:
+            df = self.split_dataframe_column(df, self.chunk_size, self.chunk_overlap)
+        if carried is None or carried.empty:
             return df
+        if df.empty:
+            return carried.reset_index(drop=True)
+        return pd.concat([carried, df], ignore_index=True)
+
+    def _emit_batches(self, buffer, row_batch_size=None, files=None, carried=None):
+        df = self._chunked_rows(buffer, carried)
+
+        if df.empty:
+            # Still report the files, so files without content are not read again
+            if files:
+                df.attrs['files'] = files
+                yield df
+            return
+
+        if not row_batch_size:
+            if files:
+                df.attrs['files'] = files
+            yield df
+            return
+
+        for start in range(0, len(df), row_batch_size):
+            batch = df.iloc[start:start + row_batch_size].reset_index(drop=True)
+            if files and start + row_batch_size >= len(df):
+                batch.attrs['files'] = files
+            yield batch
+
+    def _clear_downloads(self):
+        with self._temp_dir_lock:
+            temp_dir, self._temp_dir = self._temp_dir, None
+        if temp_dir is not None and os.path.exists(temp_dir):
+            self.delete_directory(temp_dir)
+
+    def _close_parser_pool(self):
+        with self._temp_dir_lock:
+            pool, self._parser_pool = self._parser_pool, None
+        if pool is not None:
+            pool.shutdown()
 
     def split_dataframe_column(self, df, chunk_size, chunk_overlap, column='text'):
         logger.info("Splitting dataframe into chunks...")
@@ -199,19 +585,4 @@ class FileBaseSource(BaseSource):
             logger.warning(f"Column '{column}' not found in dataframe. Skipping splitting.")
             return df
 
-        def split_text(text, size, overlap):
-            if not isinstance(text, str):
-                return []
-            return [text[i:i + size] for i in range(0, len(text), size - overlap) if text[i:i + size]]
-
-        new_rows = []
-        for _, row in df.iterrows():
-            chunks = split_text(row[column], chunk_size, chunk_overlap)
-            for chunk in chunks:
-                if chunk:
-                    new_row = row.copy()
-                    new_row[column] = chunk
-                    new_rows.append(new_row)
-
-        return pd.DataFrame(new_rows, columns=df.columns)
-
+        return split_dataframe_column(df, chunk_size, chunk_overlap, column=column)
@@ -25,8 +25,13 @@ class GoogleCloudStorageSource(FileBaseSource):
             self.connect()
 
         bucket = self.client.get_bucket(self.bucket_name)
-        blobs = bucket.list_blobs(prefix=self.prefix)
-        return [blob.name for blob in blobs if blob.name.endswith(self.file_type)]
+        files = []
+        for blob in bucket.list_blobs(prefix=self.prefix):
+            if blob.name.endswith(self.file_type):
+                files.append(blob.name)
+                # The generation changes every time the object is overwritten
+                self.file_versions[blob.name] = blob.generation
+        return files
 
     def read_file(self, file_path):
         bucket = self.client.get_bucket(self.bucket_name)
@@ -34,16 +39,18 @@ class GoogleCloudStorageSource(FileBaseSource):
         return BytesIO(blob.download_as_bytes())
 
     def download_file(self, file_path):
+        if not self.client:
+            self.connect()
+
         bucket = self.client.get_bucket(self.bucket_name)
         blob = bucket.blob(file_path)
 
-        download_folder = 'tempfile_downloads'
-        if not os.path.exists(download_folder):
-            os.makedirs(download_folder)
-
         logger.info("Downloading files from Google Cloud Storage...")
-        local_file_path = os.path.join(download_folder, file_path.split('/')[-1])
+        # Streamed to disk, so large objects can be read in chunks
+        local_file_path = self.temp_path(file_path)
         blob.download_to_filename(local_file_path)
+        logger.info(f"Downloaded {file_path} to {local_file_path}")
+        return local_file_path
 
     def delete_directory(self, path):
         for root, dirs, files in os.walk(path, topdown=False):
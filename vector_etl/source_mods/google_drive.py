@@ -8,6 +8,8 @@ from googleapiclient.discovery import build
 from googleapiclient.http import MediaIoBaseDownload
 from io import BytesIO
 from .base import BaseSource
+from .buffer import ColumnBuffer
+from ..state import FileManifest
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -19,6 +21,7 @@ class GoogleDriveSource(BaseSource):
     def __init__(self, config):
         self.config = config
         self.service = None
+        self.manifest = FileManifest.from_config(config.get('skip_unchanged_files'))
 
     def connect(self):
         logger.info("Connecting to Google Drive...")
@@ -57,21 +60,26 @@ class GoogleDriveSource(BaseSource):
 
         folder_id = self.config['folder_id']
         file_type = self.config['file_type']
-        chunk_size = self.config.get('chunk_size', 1000)
-        chunk_overlap = self.config.get('chunk_overlap', 0)
 
         query = f"'{folder_id}' in parents and mimeType contains '{file_type}'"
-        results = self.service.files().list(q=query, fields="files(id, name)").execute()
+        results = self.service.files().list(q=query, fields="files(id, name, md5Checksum, modifiedTime)").execute()
         files = results.get('files', [])
 
-        df = pd.DataFrame()
+        # Native Google documents have no checksum, only a modification time
+        versions = {file['id']: file.get('md5Checksum') or file.get('modifiedTime') for file in files}
+        changed = set(versions)
+        if self.manifest is not None:
+            changed = set(self.manifest.changed(self.manifest_key(), versions))
+            logger.info(f"{len(files) - len(changed)} of {len(files)} files are unchanged since the last run")
+
+        buffer = ColumnBuffer()
         new_files = []
 
         for file in files:
             file_id = file['id']
             file_name = file['name']
 
-            if file_id not in self.config.get('loaded_files', []):
+            if file_id in changed and file_id not in self.config.get('loaded_files', []):
                 new_files.append(file_id)
 
                 request = self.service.files().get_media(fileId=file_id)
@@ -91,31 +99,27 @@ class GoogleDriveSource(BaseSource):
                     # Implement text processing logic here
                     pass
 
-                if not df.empty:
-                    df = pd.concat([df, temp_df], ignore_index=True)
-                else:
-                    df = temp_df
-
-        if not df.empty:
-            df = self.split_dataframe_column(df, chunk_size, chunk_overlap)
+                buffer.append(temp_df)
+                buffer.end_file()
 
-        return df, new_files
+        # Chunked by the orchestrator once the embedding text is built
+        df = buffer.materialize()
+        if self.manifest is not None:
+            df.attrs['files'] = {file_id: versions[file_id] for file_id in new_files}
 
-    def split_dataframe_column(self, df, chunk_size, chunk_overlap, column='__concat_final'):
-        logger.info("Splitting dataframe into chunks...")
+        return df
 
-        def split_text(text, size, overlap):
-            if not isinstance(text, str):
-                return []
-            return [text[i:i + size] for i in range(0, len(text), size - overlap) if text[i:i + size]]
+    def manifest_key(self):
+        """Scope of this flow's entries in the file manifest."""
+        if self.config.get('flow_name'):
+            return self.config['flow_name']
+        return f"google_drive:{self.config['folder_id']}:{self.config['file_type']}"
 
-        new_rows = []
-        for _, row in df.iterrows():
-            chunks = split_text(row[column], chunk_size, chunk_overlap)
-            for chunk in chunks:
-                if chunk:
-                    new_row = row.copy()
-                    new_row[column] = chunk
-                    new_rows.append(new_row)
+    def commit_files(self, versions):
+        """Record ``versions`` (file ID -> version) of files that are now in the target."""
+        self.manifest.record(self.manifest_key(), versions)
 
-        return pd.DataFrame(new_rows, columns=df.columns)
+    def close(self):
+        if self.manifest is not None:
+            self.manifest.close()
+            self.manifest = None
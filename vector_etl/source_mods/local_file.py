@@ -1,7 +1,6 @@
 import logging
 import os
 from io import BytesIO
-import shutil
 from .file_loader import FileBaseSource
 
 logging.basicConfig(level=logging.INFO)
@@ -36,13 +35,12 @@ class LocalFileSource(FileBaseSource):
             return BytesIO(file.read())
 
     def download_file(self, file_path):
+        # Local files are parsed where they are
+        return file_path
 
-        download_folder = 'tempfile_downloads'
-        if not os.path.exists(download_folder):
-            os.makedirs(download_folder)
-
-        logger.info("Copying file(s) to local directory...")
-        shutil.copy(file_path, download_folder)
+    def file_version(self, file_path):
+        stat = os.stat(file_path)
+        return f"{stat.st_mtime_ns}:{stat.st_size}"
 
     def delete_directory(self, path):
 
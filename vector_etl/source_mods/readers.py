@@ -0,0 +1,167 @@
+import codecs
+import json
+import logging
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# File extension -> pyarrow dataset format. Feather (version 2) is the Arrow IPC file format.
+ARROW_FILE_FORMATS = {'parquet': 'parquet', 'pq': 'parquet', 'arrow': 'ipc', 'ipc': 'ipc', 'feather': 'ipc'}
+
+# Bytes read from a JSON file at a time
+JSON_BLOCK_SIZE = 1 << 20
+
+_WHITESPACE = ' \t\n\r'
+
+
+class _TextBlocks:
+    """Decoded text of a binary stream, read a block at a time."""
+
+    def __init__(self, stream, block_size):
+        self.stream = stream
+        self.block_size = block_size
+        self.decoder = codecs.getincrementaldecoder('utf-8-sig')()
+        self.text = ''
+        self.pos = 0
+        self.eof = False
+
+    def read_more(self, block_size=None):
+        """Append the next block, dropping text already consumed. Returns False at the end of the stream."""
+        if self.eof:
+            return False
+        data = self.stream.read(block_size or self.block_size)
+        self.eof = not data
+        self.text = self.text[self.pos:] + self.decoder.decode(data, final=self.eof)
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Next character that is not whitespace, or '' at the end of the stream."""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.read_more():
+                return ''
+
+
+def _next_char(text, pos):
+    while pos < len(text) and text[pos] in _WHITESPACE:
+        pos += 1
+    return text[pos] if pos < len(text) else ''
+
+
+def iter_json_array(stream, block_size=JSON_BLOCK_SIZE):
+    """
+    Yield the items of a JSON document's top-level array one at a time,
+    reading the binary ``stream`` in blocks, so memory is bounded by the
+    largest item rather than the file.
+    """
+    decoder = json.JSONDecoder()
+    blocks = _TextBlocks(stream, block_size)
+
+    if blocks.peek() != '[':
+        raise ValueError("JSON document is not an array")
+    blocks.pos += 1
+
+    if blocks.peek() == ']':
+        return
+
+    while True:
+        blocks.peek()
+        read_size = block_size
+        while True:
+            try:
+                item, end = decoder.raw_decode(blocks.text, blocks.pos)
+            except json.JSONDecodeError:
+                item, end = None, None
+            # A value is only complete once the separator after it has been read,
+            # since a number cut off at the end of a block still decodes
+            if end is not None and (blocks.eof or _next_char(blocks.text, end) in (',', ']')):
+                break
+            if not blocks.read_more(read_size):
+                raise ValueError("Truncated JSON array")
+            read_size *= 2
+
+        blocks.pos = end
+        yield item
+
+        separator = blocks.peek()
+        if separator == ']':
+            return
+        if separator != ',':
+            raise ValueError(f"Expected ',' or ']' in JSON array, found {separator!r}")
+        blocks.pos += 1
+
+
+def read_json_chunks(source, chunk_size):
+    """
+    Yield DataFrames of at most ``chunk_size`` rows from a JSON file (a path
+    or a binary file object). A top-level array of records is parsed
+    incrementally; any other layout is read whole by ``pd.read_json``.
+    """
+    stream = open(source, 'rb') if isinstance(source, str) else source
+    try:
+        if _TextBlocks(stream, 64).peek() != '[':
+            stream.seek(0)
+            df = pd.read_json(stream)
+            for start in range(0, len(df), chunk_size):
+                yield df.iloc[start:start + chunk_size].reset_index(drop=True)
+            return
+
+        stream.seek(0)
+        records = []
+        for item in iter_json_array(stream):
+            records.append(item)
+            if len(records) >= chunk_size:
+                yield pd.DataFrame.from_records(records)
+                records = []
+        if records:
+            yield pd.DataFrame.from_records(records)
+    finally:
+        if stream is not source:
+            stream.close()
+
+
+def read_arrow_chunks(source, file_type, chunk_size, columns=None, filters=None):
+    """
+    Yield DataFrames of at most ``chunk_size`` rows from a Parquet, Arrow IPC
+    or Feather file (a path or a binary file object), scanning it a row
+    group or record batch at a time.
+
+    Only the ``columns`` present in the file are decoded (all of them when
+    ``columns`` is None). ``filters`` are pyarrow-style filters, such as
+    ``[['year', '>=', 2023]]``; they are pushed down into the scan so row
+    groups whose statistics rule them out are skipped. Files on disk are
+    memory-mapped.
+    """
+    file_format = ARROW_FILE_FORMATS[file_type]
+
+    if isinstance(source, str):
+        dataset = ds.dataset(source, format=file_format, filesystem=pafs.LocalFileSystem(use_mmap=True))
+        schema = dataset.schema
+        scan = dataset.to_batches
+    else:
+        fragment_format = ds.ParquetFileFormat() if file_format == 'parquet' else ds.IpcFileFormat()
+        fragment = fragment_format.make_fragment(pa.BufferReader(source.read()))
+        schema = fragment.physical_schema
+
+        def scan(**kwargs):
+            return ds.Scanner.from_fragment(fragment, **kwargs).to_batches()
+
+    if columns is not None:
+        missing = [column for column in columns if column not in schema.names]
+        if missing:
+            logger.warning(f"Columns not in the file, skipped: {', '.join(missing)}")
+        columns = [column for column in columns if column in schema.names]
+
+    expression = pq.filters_to_expression(filters) if filters else None
+    for batch in scan(columns=columns, filter=expression, batch_size=chunk_size):
+        if batch.num_rows:
+            yield batch.to_pandas()
@@ -34,6 +34,7 @@ class S3Source(FileBaseSource):
             for obj in page.get('Contents', []):
                 if obj['Key'].endswith(self.file_type):
                     files.append(obj['Key'])
+                    self.file_versions[obj['Key']] = obj.get('ETag')
 
         return files
 
@@ -52,15 +53,12 @@ class S3Source(FileBaseSource):
         if not self.s3_client:
             self.connect()
 
-        download_folder = 'tempfile_downloads'
-        if not os.path.exists(download_folder):
-            os.makedirs(download_folder)
-
         logger.info("Downloading files from S3...")
 
-        local_file_path = os.path.join(download_folder, file_path.split('/')[-1])
+        local_file_path = self.temp_path(file_path)
         self.s3_client.download_file(self.bucket_name, file_path, local_file_path)
-        logger.info(f"Downloaded {file_path} to {os.getcwd()}")
+        logger.info(f"Downloaded {file_path} to {local_file_path}")
+        return local_file_path
 
 
     def delete_directory(self, path):
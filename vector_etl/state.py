@@ -0,0 +1,270 @@
+import datetime
+import decimal
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_DIR = '.vector_etl'
+
+# SQLite builds before 3.32 allow at most 999 bound parameters per statement
+_QUERY_CHUNK = 900
+
+
+def open_sqlite(path):
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory, exist_ok=True)
+
+    connection = sqlite3.connect(path, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    return connection
+
+
+class ChangeLedger:
+    """
+    Local record of the content hash last written for every record ID.
+
+    Rows whose ID and content hash match the ledger are unchanged since the
+    last successful write and do not need to be embedded or written again.
+    Entries are scoped per target so the same ID can be tracked for several
+    destinations.
+    """
+
+    def __init__(self, path=os.path.join(DEFAULT_STATE_DIR, 'ledger.sqlite')):
+        self.path = path
+        self._lock = threading.Lock()
+        self.connection = open_sqlite(path)
+        self.connection.execute("""CREATE TABLE IF NOT EXISTS ledger (
+                                   scope TEXT NOT NULL,
+                                   id TEXT NOT NULL,
+                                   content_hash TEXT NOT NULL,
+                                   updated_at REAL NOT NULL,
+                                   PRIMARY KEY (scope, id))""")
+        self.connection.commit()
+
+    @classmethod
+    def from_config(cls, config):
+        """Build a ledger from the source ``skip_unchanged`` option, or return None if it is off."""
+        if not config:
+            return None
+        if config is True:
+            return cls()
+        return cls(path=config.get('path', os.path.join(DEFAULT_STATE_DIR, 'ledger.sqlite')))
+
+    def changed(self, scope, ids, hashes):
+        """Return a list of booleans, True where the ID is new or its content changed."""
+        ids = list(ids)
+        stored = {}
+
+        with self._lock:
+            for i in range(0, len(ids), _QUERY_CHUNK):
+                chunk = ids[i:i + _QUERY_CHUNK]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self.connection.execute(
+                    f"SELECT id, content_hash FROM ledger WHERE scope = ? AND id IN ({placeholders})",
+                    [scope] + chunk
+                ).fetchall()
+                stored.update(rows)
+
+        return [stored.get(record_id) != content_hash for record_id, content_hash in zip(ids, hashes)]
+
+    def record(self, scope, ids, hashes):
+        now = time.time()
+        with self._lock:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO ledger (scope, id, content_hash, updated_at) VALUES (?, ?, ?, ?)",
+                [(scope, record_id, content_hash, now) for record_id, content_hash in zip(ids, hashes)]
+            )
+            self.connection.commit()
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
+
+
+class FileManifest:
+    """
+    Version of every source file last written to the target: an ETag,
+    object generation, content hash, revision, or modification time and
+    size, whatever the source lists. Files whose listed version matches
+    the manifest have not changed and are not downloaded again. Entries
+    are scoped per flow so several flows can read the same files.
+    """
+
+    default_path = os.path.join(DEFAULT_STATE_DIR, 'manifest.sqlite')
+
+    def __init__(self, path=None):
+        self.path = path or self.default_path
+        self._lock = threading.Lock()
+        self.connection = open_sqlite(self.path)
+        self.connection.execute("""CREATE TABLE IF NOT EXISTS manifest (
+                                   scope TEXT NOT NULL,
+                                   path TEXT NOT NULL,
+                                   version TEXT NOT NULL,
+                                   updated_at REAL NOT NULL,
+                                   PRIMARY KEY (scope, path))""")
+        self.connection.commit()
+
+    @classmethod
+    def from_config(cls, config):
+        """Build a manifest from the source ``skip_unchanged_files`` option, or return None if it is off."""
+        if not config:
+            return None
+        if config is True:
+            return cls()
+        return cls(path=config.get('path'))
+
+    def changed(self, scope, versions):
+        """
+        Return the paths of ``versions`` (a dict of path -> version) that are
+        new or whose version differs from the manifest, in the given order.
+        Files without a known version are always treated as changed.
+        """
+        paths = list(versions)
+        stored = {}
+
+        with self._lock:
+            for i in range(0, len(paths), _QUERY_CHUNK):
+                chunk = paths[i:i + _QUERY_CHUNK]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self.connection.execute(
+                    f"SELECT path, version FROM manifest WHERE scope = ? AND path IN ({placeholders})",
+                    [scope] + chunk
+                ).fetchall()
+                stored.update(rows)
+
+        return [path for path in paths if versions[path] is None or stored.get(path) != str(versions[path])]
+
+    def record(self, scope, versions):
+        now = time.time()
+        with self._lock:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO manifest (scope, path, version, updated_at) VALUES (?, ?, ?, ?)",
+                [(scope, path, str(version), now) for path, version in versions.items() if version is not None]
+            )
+            self.connection.commit()
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
+
+
+def encode_watermark(value):
+    """Serialize a watermark value to JSON, keeping dates and decimals round-trippable."""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if hasattr(value, 'to_pydatetime'):
+        value = value.to_pydatetime()
+
+    if isinstance(value, datetime.datetime):
+        return json.dumps({'datetime': value.isoformat()})
+    if isinstance(value, datetime.date):
+        return json.dumps({'date': value.isoformat()})
+    if isinstance(value, decimal.Decimal):
+        return json.dumps({'decimal': str(value)})
+    return json.dumps(value)
+
+
+def decode_watermark(text):
+    value = json.loads(text)
+    if isinstance(value, dict):
+        if 'datetime' in value:
+            return datetime.datetime.fromisoformat(value['datetime'])
+        if 'date' in value:
+            return datetime.date.fromisoformat(value['date'])
+        if 'decimal' in value:
+            return decimal.Decimal(value['decimal'])
+    return value
+
+
+class SQLiteWatermarkStore:
+    """Last committed watermark of every flow, kept in a local SQLite file."""
+
+    default_path = os.path.join(DEFAULT_STATE_DIR, 'watermarks.sqlite')
+
+    def __init__(self, path=None):
+        self.path = path or self.default_path
+        self._lock = threading.Lock()
+        self.connection = open_sqlite(self.path)
+        self.connection.execute("""CREATE TABLE IF NOT EXISTS watermarks (
+                                   flow TEXT PRIMARY KEY,
+                                   value TEXT NOT NULL,
+                                   updated_at REAL NOT NULL)""")
+        self.connection.commit()
+
+    def get(self, flow):
+        with self._lock:
+            row = self.connection.execute("SELECT value FROM watermarks WHERE flow = ?", (flow,)).fetchone()
+        return decode_watermark(row[0]) if row else None
+
+    def set(self, flow, value):
+        with self._lock:
+            self.connection.execute("INSERT OR REPLACE INTO watermarks (flow, value, updated_at) VALUES (?, ?, ?)",
+                                    (flow, encode_watermark(value), time.time()))
+            self.connection.commit()
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
+
+
+class JSONWatermarkStore:
+    """Last committed watermark of every flow, kept in a JSON file that is replaced atomically."""
+
+    default_path = os.path.join(DEFAULT_STATE_DIR, 'watermarks.json')
+
+    def __init__(self, path=None):
+        self.path = path or self.default_path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path) as f:
+            return json.load(f)
+
+    def get(self, flow):
+        with self._lock:
+            value = self._load().get(flow)
+        return decode_watermark(value) if value is not None else None
+
+    def set(self, flow, value):
+        with self._lock:
+            watermarks = self._load()
+            watermarks[flow] = encode_watermark(value)
+
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, 'w') as f:
+                json.dump(watermarks, f, indent=2)
+            os.replace(temp_path, self.path)
+
+    def close(self):
+        pass
+
+
+WATERMARK_STORES = {
+    'sqlite': SQLiteWatermarkStore,
+    'json': JSONWatermarkStore
+}
+
+
+def get_watermark_store(config=None):
+    """Build the watermark store named by a source ``watermark_store`` option (SQLite by default)."""
+    if not config or config is True:
+        config = {}
+
+    store_type = config.get('type', 'sqlite')
+    if store_type not in WATERMARK_STORES:
+        raise ValueError(f"Unsupported watermark store: {store_type}")
+    return WATERMARK_STORES[store_type](path=config.get('path'))
@@ -1,6 +1,9 @@
 from abc import ABC, abstractmethod
 
 class BaseTarget(ABC):
+    # Set by the orchestrator when record IDs are derived from the source, so reruns repeat them
+    stable_ids = False
+
     @abstractmethod
     def connect(self):
         pass
@@ -11,4 +14,8 @@ class BaseTarget(ABC):
 
     @abstractmethod
     def create_index_if_not_exists(self, dimension):
+        pass
+
+    def close(self):
+        """Release connections held between writes."""
         pass
\ No newline at end of file
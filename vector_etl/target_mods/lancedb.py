@@ -23,13 +23,14 @@ class LanceDBTarget(BaseTarget):
         logger.info("Connected to LanceDB successfully.")
 
     def create_index_if_not_exists(self, data):
+        """Open the table, or create it from ``data``. Returns True if it was created."""
         if self.db is None:
             self.connect()
 
         table_name = self.config["table_name"]
         try:
             self.table = self.db.open_table(table_name)
-            self.table.add(data=data, mode="append", on_bad_vectors="error")
+            return False
         except Exception:
             logger.info(f"Creating LanceDB table: {table_name}")
             # schema = {
@@ -39,6 +40,7 @@ class LanceDBTarget(BaseTarget):
             #     "domain": "string"
             # }
             self.table = self.db.create_table(table_name, data=data)
+            return True
 
 
     def write_data(self, df, columns, domain=None):
@@ -53,13 +55,23 @@ class LanceDBTarget(BaseTarget):
             df_columns = df.columns.tolist()
             result = df[df_columns].apply(lambda row: row.to_dict(), axis=1).tolist()
         elif len(columns) > 0:
-            columns += ['vector', 'concat_final', 'domain']
+            columns += ['df_uuid', 'vector', 'concat_final', 'domain']
             result = df[columns].apply(lambda row: row.to_dict(), axis=1).tolist()
 
-
-        if self.db is None:
-            self.create_index_if_not_exists(result)
-        else:
-            lancedb_table.add(data=result, mode="append", on_bad_vectors="error")
+        # A table created from this batch already holds it
+        if self.table is not None or not self.create_index_if_not_exists(result):
+            self.upsert(result)
 
         logger.info("Completed writing embeddings to LanceDB.")
+
+    def upsert(self, records):
+        """Write ``records``, replacing rows with the same df_uuid so reruns do not duplicate them."""
+        if 'df_uuid' in self.table.schema.names:
+            (self.table.merge_insert("df_uuid")
+             .when_matched_update_all()
+             .when_not_matched_insert_all()
+             .execute(records))
+        else:
+            # Tables written without the record ID can only be appended to
+            logger.warning("LanceDB table has no df_uuid column; appending, so rewritten records are duplicated")
+            self.table.add(data=records, mode="append", on_bad_vectors="error")
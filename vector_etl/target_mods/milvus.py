@@ -84,8 +84,8 @@ class MilvusTarget(BaseTarget):
             entities.append(entity)
 
         try:
-            insert_result = self.client.insert(collection_name=self.config['collection_name'], data=entities)
-            logger.info(f"Successfully inserted {insert_result['insert_count']} entities into Milvus.")
+            upsert_result = self.client.upsert(collection_name=self.config['collection_name'], data=entities)
+            logger.info(f"Successfully upserted {upsert_result['upsert_count']} entities into Milvus.")
         except Exception as e:
             logger.error(f"Failed to insert entities into Milvus: {str(e)}")
             raise
@@ -1,6 +1,6 @@
 import logging
 import pandas as pd
-from pymongo import MongoClient
+from pymongo import MongoClient, ReplaceOne
 from pymongo.errors import ConnectionFailure
 from .base import BaseTarget
 
@@ -38,6 +38,11 @@ class MongoDBTarget(BaseTarget):
             self.collection.create_index([(self.config['vector_field'], "2dsphere")], name=index_name)
             logger.info(f"Index {index_name} created successfully.")
 
+        # Upserts look documents up by id
+        if self.stable_ids and 'id_unique' not in self.collection.index_information():
+            logger.info("Creating unique index on id")
+            self.collection.create_index([('id', 1)], name='id_unique', unique=True)
+
     def write_data(self, df, columns, domain=None):
         logger.info("Writing embeddings to MongoDB...")
         if self.collection is None:
@@ -60,8 +65,15 @@ class MongoDBTarget(BaseTarget):
             documents.append(document)
 
         try:
-            result = self.collection.insert_many(documents)
-            logger.info(f"Successfully inserted {len(result.inserted_ids)} documents.")
+            if self.stable_ids:
+                # Replace by id so that reruns with stable IDs overwrite instead of duplicating
+                result = self.collection.bulk_write(
+                    [ReplaceOne({'id': document['id']}, document, upsert=True) for document in documents]
+                )
+                logger.info(f"Successfully upserted {result.upserted_count + result.matched_count} documents.")
+            else:
+                result = self.collection.insert_many(documents)
+                logger.info(f"Successfully inserted {len(result.inserted_ids)} documents.")
         except Exception as e:
             logger.error(f"Error inserting documents: {str(e)}")
             raise
@@ -11,6 +11,10 @@ class Neo4jTarget(BaseTarget):
         self.config = config
         self.driver = None
 
+        if any('unique' in rel for rel in config.get('graph_structure', {}).get('relationships', [])):
+            logger.warning("The 'unique' option of Neo4j relationships has no effect: "
+                           "relationships are always merged, so reruns do not repeat them")
+
     def connect(self):
         logger.info("Connecting to Neo4j...")
         try:
@@ -72,7 +76,8 @@ class Neo4jTarget(BaseTarget):
         relationships = self.config['graph_structure']['relationships']
 
         vector_prop = self.sanitize_property_name(self.config['vector_property'])
-        create_entity = f"CREATE (e:Entity {{id: row.id, {vector_prop}: row.embedding}})"
+        # Entities are merged on their ID, so a rerun updates them rather than adding copies
+        create_entity = f"MERGE (e:Entity {{id: row.id}}) SET e.{vector_prop} = row.embedding"
 
         create_nodes = []
         for node in nodes:
@@ -83,21 +88,19 @@ class Neo4jTarget(BaseTarget):
                     MERGE (e)-[:HAS_{node['label']}]->(n_{node['label']})
                 """)
             else:
+                # Not shared between entities: merged through the entity's own relationship, with the
+                # properties set afterwards since MERGE rejects null property values
                 create_nodes.append(f"""
-                    CREATE (n_{node['label']}:{node['label']} {{{props}}})
-                    CREATE (e)-[:HAS_{node['label']}]->(n_{node['label']})
+                    MERGE (e)-[:HAS_{node['label']}]->(n_{node['label']}:{node['label']})
+                    SET n_{node['label']} += {{{props}}}
                 """)
 
+        # Relationships are merged whether or not they are unique, so a rerun does not repeat them
         create_relationships = []
         for rel in relationships:
-            if rel.get('unique', False):
-                create_relationships.append(f"""
-                    MERGE (n_{rel['start_node']})-[:{rel['type']}]->(n_{rel['end_node']})
-                """)
-            else:
-                create_relationships.append(f"""
-                    CREATE (n_{rel['start_node']})-[:{rel['type']}]->(n_{rel['end_node']})
-                """)
+            create_relationships.append(f"""
+                MERGE (n_{rel['start_node']})-[:{rel['type']}]->(n_{rel['end_node']})
+            """)
 
         cypher_query = f"""
         UNWIND $batch AS row
@@ -144,6 +147,7 @@ class Neo4jTarget(BaseTarget):
     def close(self):
         if self.driver:
             self.driver.close()
+            self.driver = None
             logger.info("Neo4j connection closed.")
 
     def __del__(self):
@@ -3,6 +3,7 @@ import pandas as pd
 import singlestoredb as s2
 import json
 from .base import BaseTarget
+from ..pools import ConnectionPool
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -10,22 +11,31 @@ logger = logging.getLogger(__name__)
 class SingleStoreTarget(BaseTarget):
     def __init__(self, config):
         self.config = config
-        self.connection = None
+        self.pool = None
+
+    def create_connection(self):
+        connection_url = f"{self.config['singlestore_username']}:{self.config['singlestore_password']}@{self.config['singlestore_host']}:{self.config['singlestore_port']}/{self.config['singlestore_database_name']}"
+        return s2.connect(connection_url)
 
     def connect(self):
         logger.info("Connecting to SingleStore...")
-        connection_url = f"{self.config['singlestore_username']}:{self.config['singlestore_password']}@{self.config['singlestore_host']}:{self.config['singlestore_port']}/{self.config['singlestore_database_name']}"
-        self.connection = s2.connect(connection_url)
+        self.pool = ConnectionPool.from_config(self.create_connection, self.config)
         logger.info("Connected to SingleStore successfully.")
 
-    def write_data(self, df, domain=None):
+    def create_index_if_not_exists(self, dimension):
+        # Writes go to an existing singlestore_table
+        if self.pool is None:
+            self.connect()
+
+    def write_data(self, df, columns, domain=None):
         logger.info("Writing embeddings to SingleStore...")
-        if self.connection is None:
+        if self.pool is None:
             self.connect()
 
         table = self.config["singlestore_table"]
 
-        with self.connection.cursor() as cursor:
+        with self.pool.connection() as connection, connection.cursor() as cursor:
+            insert_query = self.upsert_query(cursor, table)
             for _, row in df.iterrows():
                 metadata = {
                     col: str(row[col]) if isinstance(row[col], list) else str(row[col])
@@ -35,10 +45,24 @@ class SingleStoreTarget(BaseTarget):
                     metadata["domain"] = domain
 
                 embedding = str(row["embeddings"])
-                cursor.execute(
-                    f"INSERT INTO {table} VALUES (%s, JSON_ARRAY_PACK(%s), %s)",
-                    (str(row["df_uuid"]), embedding, json.dumps(metadata))
-                )
+                cursor.execute(insert_query, (str(row["df_uuid"]), embedding, json.dumps(metadata)))
+            connection.commit()
 
-        self.connection.commit()
         logger.info("Completed writing embeddings to SingleStore.")
+
+    def upsert_query(self, cursor, table):
+        """
+        Insert statement for ``table`` (id, vector, metadata) that replaces
+        the vector and metadata of an id already in the table, so reruns
+        with stable IDs overwrite their rows. The id must be the table's
+        primary or unique key.
+        """
+        cursor.execute(f"SELECT * FROM {table} LIMIT 0")
+        cursor.fetchall()
+        id_column, *value_columns = [column[0] for column in cursor.description]
+        updates = ", ".join(f"{column} = VALUES({column})" for column in value_columns)
+        return f"INSERT INTO {table} VALUES (%s, JSON_ARRAY_PACK(%s), %s) ON DUPLICATE KEY UPDATE {updates}"
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
@@ -4,6 +4,7 @@ import vecs
 from urllib.parse import urlparse
 import psycopg2
 from .base import BaseTarget
+from ..pools import ConnectionPool
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -14,6 +15,8 @@ class SupabaseTarget(BaseTarget):
         self.config = config
         self.vx = None
         self.collection = None
+        self.pool = None
+        self.vector_size = None
 
     def connect(self):
         logger.info("Connecting to Supabase...")
@@ -34,9 +37,9 @@ class SupabaseTarget(BaseTarget):
                 dimension=dimension#self.config.get("dimension", 1536)
             )
 
-    def update_vector_size(self, table_name, vector_size):
+    def create_connection(self):
         pg_uri = urlparse(self.config["supabase_uri"])
-        connection = psycopg2.connect(
+        return psycopg2.connect(
             database=pg_uri.path[1:],
             user=pg_uri.username,
             password=pg_uri.password,
@@ -44,14 +47,26 @@ class SupabaseTarget(BaseTarget):
             port=pg_uri.port
         )
 
+    def update_vector_size(self, table_name, vector_size):
+        # The column keeps its type between writes, so only alter it when the size changes
+        if self.vector_size == vector_size:
+            return
+        if self.pool is None:
+            self.pool = ConnectionPool.from_config(self.create_connection, self.config)
+
         sql = f"""
         ALTER TABLE vecs.{table_name}
         ALTER COLUMN vec TYPE vector({vector_size});
         """
-        with connection.cursor() as cursor:
-            cursor.execute(sql)
-        connection.commit()
-        connection.close()
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(sql)
+            connection.commit()
+        self.vector_size = vector_size
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
 
     def write_data(self, df, columns, domain=None):
         logger.info("Writing embeddings to Supabase...")
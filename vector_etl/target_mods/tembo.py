@@ -5,6 +5,7 @@ import psycopg2
 import json
 from psycopg2.extras import execute_values
 from .base import BaseTarget
+from ..pools import ConnectionPool
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -13,12 +14,11 @@ logger = logging.getLogger(__name__)
 class TemboTarget(BaseTarget):
     def __init__(self, config):
         self.config = config
-        self.connection = None
-        self.cursor = None
+        self.pool = None
+        self.table_ready = False
 
-    def connect(self):
-        logger.info("Connecting to Tembo database...")
-        self.connection = psycopg2.connect(
+    def create_connection(self):
+        return psycopg2.connect(
             host=self.config["host"],
             database=self.config["database_name"],
             user=self.config["username"],
@@ -26,15 +26,24 @@ class TemboTarget(BaseTarget):
             port=self.config["port"]
         )
 
+    def connect(self):
+        logger.info("Connecting to Tembo database...")
+        self.pool = ConnectionPool.from_config(self.create_connection, self.config)
+
     def create_index_if_not_exists(self, dimension):
-        if self.connection is None:
+        if self.pool is None:
             self.connect()
 
+        with self.pool.connection() as connection:
+            self._create_table(connection, dimension)
+        self.table_ready = True
+
+    def _create_table(self, connection, dimension):
         schema_name = self.config["schema_name"]
         table_name = self.config["table_name"]
 
         table_list_query = f"SELECT table_name FROM information_schema.tables WHERE table_schema = '{schema_name}'"
-        cursor = self.connection.cursor()
+        cursor = connection.cursor()
         cursor.execute(table_list_query)
         tables = cursor.fetchall()
         tables_flat = [item for sublist in tables for item in sublist]
@@ -46,14 +55,14 @@ class TemboTarget(BaseTarget):
                                     embedding vector({dimension}),
                                     metadata jsonb);
                                     """
-            with self.connection.cursor() as cursor:
+            with connection.cursor() as cursor:
                 cursor.execute(create_schema_query)
                 cursor.execute(create_table_query)
-            self.connection.commit()
+            connection.commit()
 
     def write_data(self, df, columns, domain=None):
         logger.info("Writing embeddings to Tembo...")
-        if self.connection is None:
+        if not self.table_ready:
             self.create_index_if_not_exists(len(df['embeddings'].iat[0]))
 
         schema_name = self.config["schema_name"]
@@ -80,15 +89,22 @@ class TemboTarget(BaseTarget):
 
                 data.append((str(row["df_uuid"]), row["embeddings"], metadata))
 
-        insert_data = [(id, embedding, json.dumps(metadata)) for id, embedding, metadata in data]
+        # ON CONFLICT cannot update a row twice in one statement, so keep only the last row per id
+        insert_data = list({id: (id, embedding, json.dumps(metadata)) for id, embedding, metadata in data}.values())
 
         insert_query = f"""INSERT INTO {schema_name}.{table_name} (id, embedding, metadata)
                            VALUES %s
+                           ON CONFLICT (id) DO UPDATE
+                           SET embedding = EXCLUDED.embedding, metadata = EXCLUDED.metadata
                             """
 
-        with self.connection.cursor() as cur:
-            execute_values(cur, insert_query, insert_data)
-            self.connection.commit()
+        with self.pool.connection() as connection:
+            with connection.cursor() as cur:
+                execute_values(cur, insert_query, insert_data)
+            connection.commit()
 
-        self.connection.close()
         logger.info("Completed writing embeddings to Tembo.")
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
@@ -60,33 +60,22 @@ class WeaviateTarget(BaseTarget):
                 if len(columns) > 0:
                     # columns.append("__concat_final")
                     metadata = {col: str(row[col]) for col in columns}
-
-
-                    if domain:
-                        metadata["domain"] = domain
-
-                    params = {
-                        "uuid": str(row["df_uuid"]),
-                        "data_object": metadata,
-                        "class_name": class_name,
-                        "vector": row["embeddings"]
-                    }
                 else:
                     metadata = {
                         col: str(row[col]) if isinstance(row[col], list) else str(row[col])
                         for col in df.columns if
                         col not in ["df_uuid", "embeddings", "__concat_final"] and pd.notna(row[col])
                     }
-                    if domain:
-                        metadata["domain"] = domain
-
-                    params = {
-                        "uuid": str(row["df_uuid"]),
-                        "data_object": metadata,
-                        "class_name": class_name,
-                        "vector": row["embeddings"]
-                    }
+                if domain:
+                    metadata["domain"] = domain
 
-                batch.add_data_object(**params)
+                # A batch import replaces the object already stored under this uuid,
+                # so reruns with stable IDs overwrite their vectors
+                batch.add_data_object(
+                    data_object=metadata,
+                    class_name=class_name,
+                    uuid=str(row["df_uuid"]),
+                    vector=row["embeddings"]
+                )
 
         logger.info("Completed writing embeddings to Weaviate.")